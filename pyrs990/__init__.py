@@ -1,32 +1,92 @@
-from .annual_record import (
-    ANNUAL_FIELD_NAMES,
-    AnnualIndex,
-    AnnualRecord,
-    AnnualRecordDict,
-    AnnualYear,
-)
-from .bmf_record import (
-    BMF_FIELD_NAMES,
-    BMFIndex,
-    BMFRecord,
-    BMFRecordDict,
-    BMFRegion,
-)
-from .cache import Cache, DirectoryCache, MemoryCache
-from .constants import (
-    AWS_FILING_TEMPLATE,
-    AWS_INDEX_TEMPLATE,
-    DEFAULT_CACHE_PATH,
-    IRS_BMF_TEMPLATE,
-)
-from .downloader import Downloader, DownloaderException, HTTPDownloader
-from .filing import Filing
-from .formatter import (
-    FileFormatter,
-    Formatter,
-    FormatterException,
-    JSONFormatter,
-)
-from .index import Index, IndexRecord
-from .querier import Querier
-from .result import Result
+import sys
+from importlib import import_module
+from typing import TYPE_CHECKING, Dict, Iterable, List, cast
+
+if TYPE_CHECKING:
+    from .annual_record import (
+        ANNUAL_FIELD_NAMES,
+        AnnualIndex,
+        AnnualRecord,
+        AnnualRecordDict,
+        AnnualYear,
+    )
+    from .bmf_record import (
+        BMF_FIELD_NAMES,
+        BMFIndex,
+        BMFRecord,
+        BMFRecordDict,
+        BMFRegion,
+    )
+    from .cache import Cache, DirectoryCache, MemoryCache
+    from .constants import (
+        AWS_FILING_TEMPLATE,
+        AWS_INDEX_TEMPLATE,
+        DEFAULT_CACHE_PATH,
+        IRS_BMF_TEMPLATE,
+    )
+    from .downloader import Downloader, DownloaderException, HTTPDownloader
+    from .filing import FILING_FIELD_NAMES, Filing
+    from .formatter import (
+        FileFormatter,
+        Formatter,
+        FormatterException,
+        JSONFormatter,
+    )
+    from .index import INDEX_FIELD_NAMES, Index, IndexRecord
+    from .querier import Querier
+    from .result import Result
+
+# The public names below are imported on first access (PEP 562) so that
+# importing the package, or running something cheap like `--version`,
+# doesn't drag in every submodule and its dependencies.
+_EXPORTS: Dict[str, str] = {
+    "ANNUAL_FIELD_NAMES": "annual_record",
+    "AnnualIndex": "annual_record",
+    "AnnualRecord": "annual_record",
+    "AnnualRecordDict": "annual_record",
+    "AnnualYear": "annual_record",
+    "BMF_FIELD_NAMES": "bmf_record",
+    "BMFIndex": "bmf_record",
+    "BMFRecord": "bmf_record",
+    "BMFRecordDict": "bmf_record",
+    "BMFRegion": "bmf_record",
+    "Cache": "cache",
+    "DirectoryCache": "cache",
+    "MemoryCache": "cache",
+    "AWS_FILING_TEMPLATE": "constants",
+    "AWS_INDEX_TEMPLATE": "constants",
+    "DEFAULT_CACHE_PATH": "constants",
+    "IRS_BMF_TEMPLATE": "constants",
+    "Downloader": "downloader",
+    "DownloaderException": "downloader",
+    "HTTPDownloader": "downloader",
+    "FILING_FIELD_NAMES": "filing",
+    "Filing": "filing",
+    "FileFormatter": "formatter",
+    "Formatter": "formatter",
+    "FormatterException": "formatter",
+    "JSONFormatter": "formatter",
+    "INDEX_FIELD_NAMES": "index",
+    "Index": "index",
+    "IndexRecord": "index",
+    "Querier": "querier",
+    "Result": "result",
+}
+
+__all__ = list(_EXPORTS.keys())
+
+
+def __getattr__(name: str) -> object:
+    module_name = _EXPORTS.get(name, None)
+    if module_name is None:
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+    module = import_module(f".{module_name}", __name__)
+    value = cast(object, getattr(module, name))
+    # Keep the value on the package so later lookups don't come back here
+    setattr(sys.modules[__name__], name, value)
+    return value
+
+
+def __dir__() -> List[str]:
+    names = cast(Iterable[str], globals())
+    return sorted(set(names) | set(_EXPORTS.keys()))
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from functools import partial
+from io import BufferedReader
+from logging import getLogger
+from typing import List, Optional, Sequence, TextIO
+
+from ._streams import ChunkReader
+
+_logger = getLogger(__name__)
+
+_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv_columns(
+    index_file: TextIO, field_names: Sequence[str],
+) -> Optional[List[List[str]]]:
+    """
+    Parse a CSV index file using pyarrow, if it is installed, and return
+    the values of the given fields as one list per field, in the order
+    the field names were given. Every value is kept as a string.
+
+    If pyarrow isn't available `None` is returned and nothing is read
+    from the file, so the caller can fall back to the `csv` module.
+    """
+    try:
+        import pyarrow
+        import pyarrow.csv
+    except ImportError:
+        return None
+
+    # Arrow wants UTF-8 bytes. We go through the text layer, rather than
+    # reading any underlying binary stream directly, so that the file's
+    # own encoding and error handling are respected, but re-encode it a
+    # piece at a time as Arrow reads.
+    pieces = iter(partial(index_file.read, _CHUNK_SIZE), "")
+    chunks = (piece.encode("utf-8") for piece in pieces)
+    source = BufferedReader(ChunkReader(chunks), _CHUNK_SIZE)
+
+    _logger.debug(f"parsing index with pyarrow {pyarrow.__version__}")
+    table = pyarrow.csv.read_csv(
+        source,
+        read_options=pyarrow.csv.ReadOptions(use_threads=False),
+        convert_options=pyarrow.csv.ConvertOptions(
+            column_types={name: pyarrow.string() for name in field_names},
+            include_columns=list(field_names),
+        ),
+    )
+
+    return [table.column(name).to_pylist() for name in field_names]
@@ -1,27 +1,31 @@
 from __future__ import annotations
 
-import dataclasses as dc
-import json
 import logging
 from argparse import ArgumentParser, Namespace
 from datetime import datetime
-from typing import Any, Dict, Iterable, List, Mapping, NamedTuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Sequence,
+)
 
 from .cache import Cache, DirectoryCache, MemoryCache
 from .constants import (
     CURRENT_VERSION,
     DEFAULT_CACHE_PATH,
+    DEFAULT_CONCURRENCY,
     PROGRAM_DESCRIPTION,
     PROGRAM_NAME,
 )
-from .filing import Filing
-from .formatter import (
-    FileFormatter,
-    Formatter,
-    get_formatter,
-    registered_formatters,
-)
-from .index import IndexRecord
+
+if TYPE_CHECKING:
+    from .filters import CompiledFilters
+    from .formatter import Formatter
 
 _log_levels = {
     "none": -100,
@@ -35,131 +39,187 @@ _log_levels = {
 _logger = logging.getLogger(__name__)
 
 
-parser = ArgumentParser(
-    prog=PROGRAM_NAME,
-    description=PROGRAM_DESCRIPTION,
-    epilog="A project of *Code for Montana*.",
-)
+def _add_version_argument(parser: ArgumentParser) -> None:
+    parser.add_argument(
+        "--version", "-v", action="version", version=CURRENT_VERSION,
+    )
 
-parser.add_argument(
-    "--version", "-v", action="version", version=CURRENT_VERSION,
-)
 
-parser.add_argument(
-    "--use-disk-cache",
-    action="store_true",
-    default=False,
-    help="cache index and filing documents to disk",
-)
+def handle_version(argv: Sequence[str]) -> None:
+    """
+    Print the version and exit if it was requested in the given
+    arguments. This lets `--version` skip building the full parser,
+    which requires importing most of the package.
+    """
+    parser = ArgumentParser(prog=PROGRAM_NAME, add_help=False)
+    _add_version_argument(parser)
+    parser.parse_known_args(argv)
+
+
+def build_parser() -> ArgumentParser:
+    """
+    Construct the command line argument parser. The filter flags are
+    derived from the index and filing fields, so this imports those
+    modules, which is why it is deferred until arguments are parsed.
+    """
+    from .filing import FILING_FIELD_NAMES
+    from .formatter import registered_formatters
+    from .index import INDEX_FIELD_NAMES
+
+    parser = ArgumentParser(
+        prog=PROGRAM_NAME,
+        description=PROGRAM_DESCRIPTION,
+        epilog="A project of *Code for Montana*.",
+    )
 
-parser.add_argument(
-    "--cache-path",
-    type=str,
-    default=DEFAULT_CACHE_PATH,
-    help="path to use for reading and writing cache data",
-)
+    _add_version_argument(parser)
 
-parser.add_argument(
-    "--dry-run",
-    action="store_true",
-    default=False,
-    help="report how many documents would be "
-    + "downloaded / process and nothing else",
-)
+    parser.add_argument(
+        "--use-disk-cache",
+        action="store_true",
+        default=False,
+        help="cache index and filing documents to disk",
+    )
 
-parser.add_argument(
-    "--load-filters",
-    action="append",
-    type=str,
-    help="read filters from a JSON file",
-)
+    parser.add_argument(
+        "--cache-path",
+        type=str,
+        default=DEFAULT_CACHE_PATH,
+        help="path to use for reading and writing cache data",
+    )
 
-parser.add_argument(
-    "--log-level",
-    type=str,
-    choices=_log_levels.keys(),
-    default="none",
-    help="set the log level, no logging is done by default",
-)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help="number of filings to download at the same time",
+    )
 
-parser.add_argument(
-    "--no-confirm",
-    action="store_true",
-    default=False,
-    help="do not interactively confirm large downloads, for shell scripts",
-)
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        default=False,
+        help="report how many documents would be "
+        + "downloaded / process and nothing else",
+    )
 
-parser.add_argument(
-    "--save-filters", type=str, help="save the filters applied to a JSON file",
-)
+    parser.add_argument(
+        "--load-filters",
+        action="append",
+        type=str,
+        help="read filters from a JSON file",
+    )
 
-if "json" in registered_formatters():
     parser.add_argument(
-        "--to-json",
+        "--log-level",
+        type=str,
+        choices=_log_levels.keys(),
+        default="none",
+        help="set the log level, no logging is done by default",
+    )
+
+    parser.add_argument(
+        "--no-confirm",
         action="store_true",
         default=False,
-        help="output extracted data to JSON, equivalent to --formatter=json",
+        help="do not interactively confirm large downloads, for shell scripts",
     )
 
-parser.add_argument(
-    "--formatter",
-    type=str,
-    choices=registered_formatters(),
-    default=registered_formatters()[0],
-    help="output formatter, use --destination to specify file name",
-)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=0,
+        help="number of processes to parse filings on "
+        + "(0 parses them on the download threads)",
+    )
 
-parser.add_argument(
-    "--destination",
-    type=str,
-    default=":stdout:",
-    help="file to which output should be written (or ':stdout:', ':stderr:')",
-)
+    parser.add_argument(
+        "--save-filters",
+        type=str,
+        help="save the filters applied to a JSON file",
+    )
 
-parser.add_argument(
-    "--regions",
-    type=str,
-    default="mt",
-    help="regions to search, comma-separated "
-    + "(two character state abbreviations, for most)",
-)
+    formatter_names = registered_formatters()
 
-parser.add_argument(
-    "--years",
-    type=str,
-    default=":current:",
-    help="years to search, comma-separated "
-    + "(':current:' is the most recent completed year)",
-)
+    if "json" in formatter_names:
+        parser.add_argument(
+            "--to-json",
+            action="store_true",
+            default=False,
+            help="output extracted data to JSON, "
+            + "equivalent to --formatter=json",
+        )
+    else:
+        parser.set_defaults(to_json=False)
 
-# -------------------- #
-# Index record filters #
-# -------------------- #
+    parser.add_argument(
+        "--formatter",
+        type=str,
+        choices=formatter_names,
+        default=formatter_names[0],
+        help="output formatter, use --destination to specify file name",
+    )
 
-for index_filter_field_name in IndexRecord.field_names():
     parser.add_argument(
-        f"--{index_filter_field_name}",
+        "--destination",
         type=str,
-        help=f"apply a filter to the {index_filter_field_name} index field",
+        default=":stdout:",
+        help="file to which output should be written "
+        + "(or ':stdout:', ':stderr:')",
     )
 
-# -------------- #
-# Filing filters #
-# -------------- #
+    parser.add_argument(
+        "--regions",
+        type=str,
+        default="mt",
+        help="regions to search, comma-separated "
+        + "(two character state abbreviations, for most)",
+    )
 
-for filing_filter_field_name in dc.fields(Filing):
-    name = filing_filter_field_name.name
     parser.add_argument(
-        f"--{filing_filter_field_name.name}",
+        "--years",
         type=str,
-        help=f"apply a filter to the {name} filing field",
+        default=":current:",
+        help="years to search, comma-separated "
+        + "(':current:' is the most recent completed year)",
     )
 
+    # -------------------- #
+    # Index record filters #
+    # -------------------- #
+
+    for index_filter_field_name in INDEX_FIELD_NAMES:
+        parser.add_argument(
+            f"--{index_filter_field_name}",
+            type=str,
+            help=f"apply a filter to the {index_filter_field_name} "
+            + "index field",
+        )
+
+    # -------------- #
+    # Filing filters #
+    # -------------- #
+
+    for filing_filter_field_name in FILING_FIELD_NAMES:
+        parser.add_argument(
+            f"--{filing_filter_field_name}",
+            type=str,
+            help=f"apply a filter to the {filing_filter_field_name} "
+            + "filing field",
+        )
+
+    return parser
+
 
 class Options(NamedTuple):
     @staticmethod
     def from_args(args: Namespace) -> Options:
-        if hasattr(args, "to_json") and args.to_json:
+        from .filing import FILING_FIELD_NAMES
+        from .filters import compile_filters
+        from .formatter import FileFormatter, get_formatter
+        from .index import INDEX_FIELD_NAMES
+
+        if args.to_json:
             formatter = get_formatter("json", args.destination)
         else:
             formatter = get_formatter(args.formatter, args.destination)
@@ -175,27 +235,28 @@ class Options(NamedTuple):
             index_cache = MemoryCache()
             filing_cache = MemoryCache()
 
+        arg_values: Dict[str, Any] = vars(args)
+
         # Gather all the index filters
-        index_filters: Dict[str, str] = {}
-        for index_field_name in IndexRecord.field_names():
-            if hasattr(args, index_field_name):
-                value = getattr(args, index_field_name)
-                if value is not None:
-                    index_filters[index_field_name] = value
+        index_filters: Dict[str, str] = {
+            name: arg_values[name]
+            for name in INDEX_FIELD_NAMES
+            if arg_values.get(name) is not None
+        }
         _logger.debug(f"extracted index filters: {index_filters}")
 
         # Gather all the filing filters
-        filing_filters: Dict[str, str] = {}
-        for filing_field_name in dc.fields(Filing):
-            name = filing_field_name.name
-            if hasattr(args, name):
-                value = getattr(args, name)
-                if value is not None:
-                    filing_filters[name] = value
+        filing_filters: Dict[str, str] = {
+            name: arg_values[name]
+            for name in FILING_FIELD_NAMES
+            if arg_values.get(name) is not None
+        }
         _logger.debug(f"extracted filing filters: {filing_filters}")
 
         # Check for JSON files specifying filters
         if args.load_filters is not None:
+            import json
+
             for filters_path in args.load_filters:
                 with open(filters_path) as filters_file:
                     filters_data: Dict[str, Any] = json.load(filters_file)
@@ -212,6 +273,8 @@ class Options(NamedTuple):
 
         # Save filters if we need to do so
         if args.save_filters is not None:
+            import json
+
             payload = {
                 "index": index_filters,
                 "filing": filing_filters,
@@ -219,6 +282,10 @@ class Options(NamedTuple):
             with open(args.save_filters, "w") as saveFile:
                 json.dump(payload, saveFile)
 
+        # Compile the filters now, they are applied to every record
+        compiled_index_filters = compile_filters(index_filters)
+        compiled_filing_filters = compile_filters(filing_filters)
+
         # Figure out the years we want
         years: List[str] = []
         years_str = args.years.split(",")
@@ -240,6 +307,7 @@ class Options(NamedTuple):
             regions.append(region_str)
 
         return Options(
+            concurrency=args.concurrency,
             dry_run=args.dry_run,
             formatter=formatter,
             filing_cache=filing_cache,
@@ -247,13 +315,18 @@ class Options(NamedTuple):
             log_level=_log_levels[args.log_level],
             log_level_human=args.log_level,
             no_confirm=args.no_confirm,
+            processes=args.processes,
             filing_filters=filing_filters,
             index_filters=index_filters,
+            compiled_index_filters=compiled_index_filters,
+            compiled_filing_filters=compiled_filing_filters,
             to_json=args.to_json,
             regions=regions,
             years=years,
         )
 
+    concurrency: int
+
     dry_run: bool
 
     formatter: Formatter
@@ -276,4 +349,10 @@ class Options(NamedTuple):
 
     index_filters: Mapping[str, str] = {}
 
+    compiled_index_filters: CompiledFilters = ()
+
+    compiled_filing_filters: CompiledFilters = ()
+
+    processes: int = 0
+
     to_json: bool = False
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from io import RawIOBase, TextIOBase
+from typing import Any, Iterator, List, Optional
+
+
+def _close_chunks(chunks: Iterator) -> None:
+    close = getattr(chunks, "close", None)
+    if close is not None:
+        close()
+
+
+class ChunkReader(RawIOBase):
+    """
+    A raw binary stream over an iterator of byte chunks. Each chunk is
+    copied straight into the reader's buffer, a piece at a time, without
+    slicing copies of it along the way. Closing the stream closes the
+    iterator, if it can be closed.
+
+    >>> from io import BufferedReader
+    >>> reader = BufferedReader(ChunkReader(iter([b"a,b", b"", b"\\nc"])), 2)
+    >>> reader.read()
+    b'a,b\\nc'
+    """
+
+    _chunks: Iterator[bytes]
+
+    _offset: int
+
+    _pending: memoryview
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._offset = 0
+        self._pending = memoryview(b"")
+
+    def close(self) -> None:
+        _close_chunks(self._chunks)
+        super().close()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while self._offset == len(self._pending):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return 0
+            self._offset = 0
+            self._pending = memoryview(chunk)
+
+        count = min(len(buffer), len(self._pending) - self._offset)
+        buffer[:count] = self._pending[self._offset : self._offset + count]
+        self._offset += count
+        return count
+
+
+class TextChunkReader(TextIOBase):
+    """
+    A text stream over an iterator of pieces of text, such as a document
+    that is still arriving. Reads return at most the rest of the current
+    piece, so nothing is joined or copied unless a whole line, or the
+    whole stream, is asked for. Closing the stream closes the iterator,
+    if it can be closed.
+
+    >>> reader = TextChunkReader(iter(["a,b\\nc", "", ",d\\n", "e"]))
+    >>> reader.read(2)
+    'a,'
+    >>> list(reader)
+    ['b\\n', 'c,d\\n', 'e']
+    >>> reader.read()
+    ''
+    """
+
+    _chunks: Iterator[str]
+
+    _offset: int
+
+    _pending: str
+
+    def __init__(self, chunks: Iterator[str]):
+        self._chunks = chunks
+        self._offset = 0
+        self._pending = ""
+
+    def close(self) -> None:
+        _close_chunks(self._chunks)
+        super().close()
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> str:
+        if size is None or size < 0:
+            parts = [self._pending[self._offset :]]
+            parts.extend(self._chunks)
+            self._offset = 0
+            self._pending = ""
+            return "".join(parts)
+
+        if self._offset == len(self._pending) and not self._next_chunk():
+            return ""
+        text = self._pending[self._offset : self._offset + size]
+        self._offset += len(text)
+        return text
+
+    # io.TextIOBase narrows readline to text the same way in typeshed
+    def readline(self, size: int = -1) -> str:  # type: ignore[override]
+        parts: List[str] = []
+        remaining = size
+        while remaining != 0:
+            if self._offset == len(self._pending) and not self._next_chunk():
+                break
+            end = self._pending.find("\n", self._offset) + 1
+            if end == 0:
+                end = len(self._pending)
+            if remaining > 0:
+                end = min(end, self._offset + remaining)
+                remaining -= end - self._offset
+            parts.append(self._pending[self._offset : end])
+            self._offset = end
+            if parts[-1].endswith("\n"):
+                break
+        return "".join(parts)
+
+    def _next_chunk(self) -> bool:
+        for chunk in self._chunks:
+            if chunk:
+                self._offset = 0
+                self._pending = chunk
+                return True
+        return False
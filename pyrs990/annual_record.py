@@ -1,9 +1,21 @@
 from __future__ import annotations
 
 import csv
+from collections import OrderedDict
 from logging import getLogger
-from typing import Any, Dict, Iterator, List, NamedTuple, NewType, TextIO
-
+from operator import itemgetter
+from threading import Lock
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    NewType,
+    TextIO,
+)
+
+from ._arrow import read_csv_columns
 from .downloader import Downloader
 from .types import EIN
 
@@ -22,6 +34,9 @@ ANNUAL_FIELD_NAMES: List[str] = [
     "OBJECT_ID",
 ]
 
+# Pulls the fields out of a dictionary row in record order
+_annual_values = itemgetter(*ANNUAL_FIELD_NAMES)
+
 
 AnnualYear = NewType("AnnualYear", int)
 """
@@ -49,20 +64,43 @@ class AnnualRecord(NamedTuple):
 
     @staticmethod
     def from_csv(index_file: TextIO,) -> Iterator[AnnualRecord]:
-        for row in csv.DictReader(index_file):
-            record = AnnualRecord.from_dict(AnnualRecordDict(row))
-            yield record
+        make = AnnualRecord._make
+
+        columns = read_csv_columns(index_file, ANNUAL_FIELD_NAMES)
+        if columns is not None:
+            for values in zip(*columns):
+                yield make(values)
+            return
+
+        reader = csv.reader(index_file)
+        header = next(reader, None)
+        if header is None:
+            return
+
+        # Work out where each field lives once so that each row can be
+        # turned into a record with a single C-level lookup.
+        try:
+            pick = itemgetter(
+                *[header.index(name) for name in ANNUAL_FIELD_NAMES]
+            )
+        except ValueError as e:
+            _logger.error(f"malformed index header - '{e}' - '{header}'")
+            raise
+
+        for row in reader:
+            try:
+                yield make(pick(row))
+            except IndexError:
+                _logger.error(f"malformed index row - '{row}'")
+                raise
 
     @staticmethod
     def from_dict(d: AnnualRecordDict,) -> AnnualRecord:
-        params: Dict[str, str] = {}
         try:
-            for name in ANNUAL_FIELD_NAMES:
-                params[name.lower()] = d[name]
+            return AnnualRecord._make(_annual_values(d))
         except KeyError as e:
             _logger.error(f"malformed index row - '{e}' - '{d}'")
             raise
-        return AnnualRecord(**params)
 
     def __repr__(self):
         return self.__str__()
@@ -73,8 +111,13 @@ class AnnualRecord(NamedTuple):
     def to_dict(self) -> Dict[str, Any]:
         """
         Support for JSON serialization.
+
+        >>> with open("fixtures/annual_index.csv") as index_file:
+        ...     record = next(AnnualRecord.from_csv(index_file))
+        >>> record.to_dict()["ein"]
+        '133085892'
         """
-        return dict(self.__dict__)
+        return dict(zip(self._fields, self))
 
     return_id: str
     """Unique identifier for the tax filing."""
@@ -113,11 +156,21 @@ geographic information.
 """
 
 
+ANNUAL_INDEX_CACHE_SIZE = 16
+"""
+The maximum number of annual indices kept in memory at once. When more
+are requested, the least recently used index is dropped.
+"""
+
+
 # This is the global register for Annual indices. Since a given index
 # should never change at runtime, we cache them for efficiency. Only
 # the indices that are required will be created and they can be reused
-# without significant additional cost.
-_annual_indices: Dict[AnnualYear, AnnualIndex] = {}
+# without significant additional cost. The register is bounded so that
+# a long-running process doesn't hold on to every index it has seen.
+# Indices may be loaded from several threads at once, hence the lock.
+_annual_indices_lock = Lock()
+_annual_indices: OrderedDict[AnnualYear, AnnualIndex] = OrderedDict()
 
 
 def get_annual_index(year: AnnualYear, downloader: Downloader) -> AnnualIndex:
@@ -138,13 +191,20 @@ def get_annual_index(year: AnnualYear, downloader: Downloader) -> AnnualIndex:
     >>> "133085892" in index0
     True
     """
-    if year in _annual_indices:
-        return _annual_indices[year]
+    with _annual_indices_lock:
+        if year in _annual_indices:
+            _annual_indices.move_to_end(year)
+            return _annual_indices[year]
 
     index: AnnualIndex = {}
-    _annual_indices[year] = index
 
-    index_file = downloader.fetch(str(year))
-    for record in AnnualRecord.from_csv(index_file):
-        index[EIN(record.ein)] = record
+    with downloader.fetch(str(year)) as index_file:
+        for record in AnnualRecord.from_csv(index_file):
+            index[EIN(record.ein)] = record
+
+    with _annual_indices_lock:
+        _annual_indices[year] = index
+        while len(_annual_indices) > ANNUAL_INDEX_CACHE_SIZE:
+            _annual_indices.popitem(last=False)
+
     return index
@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from logging import getLogger
 
 from ._options import Options
@@ -5,7 +6,12 @@ from .annual_record import AnnualYear, get_annual_index
 from .bmf_record import BMFRegion, get_bmf_index
 from .constants import AWS_FILING_TEMPLATE, AWS_INDEX_TEMPLATE, IRS_BMF_TEMPLATE
 from .downloader import HTTPDownloader
-from .filters import filter_filings, filter_index_record
+from .filters import (
+    filter_annual_index,
+    filter_bmf_index,
+    filter_filings,
+    split_bmf_filters,
+)
 from .formatter import Formatter
 from .index import Index
 from .result import Result
@@ -21,6 +27,12 @@ If more than this number of documents will be downloaded, interactively
 confirm before starting unless the --no-confirm flag was passed.
 """
 
+INDEX_DOWNLOAD_WORKERS = 8
+"""
+The maximum number of index files (years and regions) that will be
+downloaded at the same time.
+"""
+
 
 def _message_count(download_count: int, cache_count: int) -> str:
     return (
@@ -42,35 +54,50 @@ def run(options: Options):
     annual_downloader = HTTPDownloader(AWS_INDEX_TEMPLATE, options.index_cache,)
     bmf_downloader = HTTPDownloader(IRS_BMF_TEMPLATE, options.index_cache,)
 
-    index = Index()
-    for year in options.years:
-        _logger.debug(f"applying year filter for {year}")
-        typed_year = AnnualYear(int(year))
-        index.add_annual_index(
-            typed_year, get_annual_index(typed_year, annual_downloader,),
-        )
-
-    for region in options.regions:
-        _logger.debug(f"applying region filter for {region}")
-        typed_region = BMFRegion(region)
-        index.add_bmf_index(
-            typed_region, get_bmf_index(typed_region, bmf_downloader,),
+    years = [AnnualYear(int(year)) for year in options.years]
+    regions = [BMFRegion(region) for region in options.regions]
+
+    # The index downloads don't depend on one another, so we run them
+    # concurrently to overlap the time spent waiting on the network.
+    workers = min(INDEX_DOWNLOAD_WORKERS, len(years) + len(regions))
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        annual_futures = [
+            executor.submit(get_annual_index, year, annual_downloader)
+            for year in years
+        ]
+        bmf_futures = [
+            executor.submit(get_bmf_index, region, bmf_downloader)
+            for region in regions
+        ]
+
+        # Filters on BMF-only fields are applied to each BMF index up
+        # front so that they only have to scan the relevant columns. The
+        # rest concern annual fields and are applied to each annual
+        # index the same way, so the join only sees matching records.
+        bmf_filters, annual_filters = split_bmf_filters(
+            options.compiled_index_filters
         )
 
-    if len(options.index_filters) > 0:
-        _logger.debug(f"applying index filters: {options.index_filters}")
-        index.add_filter(filter_index_record(options.index_filters))
-
-    filing_downloader = HTTPDownloader(
-        AWS_FILING_TEMPLATE, options.filing_cache,
-    )
-    result = Result(filing_downloader, index,)
-    if len(options.filing_filters) > 0:
-        _logger.debug(f"applying filing filters: {options.filing_filters}")
-        result = result.add_filter(filter_filings(options.filing_filters))
-
-    formatter = options.formatter
-    download_count = result.download_count()
+        index = Index()
+        for year, annual_future in zip(years, annual_futures):
+            _logger.debug(f"applying year filter for {year}")
+            annual_index = annual_future.result()
+            if len(annual_filters) > 0:
+                _logger.debug(f"applying annual filters: {annual_filters}")
+                annual_index = filter_annual_index(annual_index, annual_filters)
+            index.add_annual_index(year, annual_index)
+
+        for region, bmf_future in zip(regions, bmf_futures):
+            _logger.debug(f"applying region filter for {region}")
+            bmf_index = bmf_future.result()
+            if len(bmf_filters) > 0:
+                _logger.debug(f"applying BMF filters: {bmf_filters}")
+                bmf_index = filter_bmf_index(bmf_index, bmf_filters)
+            index.add_bmf_index(region, bmf_index)
+
+    # Every indexed filing gets downloaded, filing filters can only be
+    # applied afterward, so the index alone tells us the download count.
+    download_count = len(index)
 
     # TODO: Have it check the cache and adjust downloads, process separately
     # TODO: Formatter should get a chance to modify / format messages
@@ -80,6 +107,8 @@ def run(options: Options):
         print(_message_count(download_count, 0))
         return
 
+    formatter = options.formatter
+
     if not options.no_confirm and download_count > LIMIT_BEFORE_CONFIRM:
         _logger.debug(f"downloading {download_count} documents, confirming")
         if not _confirm(download_count, 0, formatter):
@@ -88,6 +117,21 @@ def run(options: Options):
             print("Aborting")
             return
 
+    filing_downloader = HTTPDownloader(
+        AWS_FILING_TEMPLATE, options.filing_cache, options.concurrency,
+    )
+    result = Result(
+        filing_downloader,
+        index,
+        (),
+        options.concurrency,
+        processes=options.processes,
+    )
+    filing_filters = options.compiled_filing_filters
+    if len(filing_filters) > 0:
+        _logger.debug(f"applying filing filters: {filing_filters}")
+        result = result.add_filter(filter_filings(filing_filters))
+
     formatter.prologue()
     formatter.write_all(result)
     formatter.epilogue()
@@ -1,9 +1,25 @@
 from __future__ import annotations
 
 import csv
+from collections import OrderedDict
 from logging import getLogger
-from typing import Any, Dict, Iterable, List, NamedTuple, NewType, TextIO
+from operator import itemgetter
+from sys import intern
+from threading import Lock
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    NewType,
+    Optional,
+    TextIO,
+    Tuple,
+)
 
+from ._arrow import read_csv_columns
 from .downloader import Downloader
 from .types import EIN
 
@@ -41,6 +57,43 @@ BMF_FIELD_NAMES: List[str] = [
     "SORT_NAME",
 ]
 
+# Pulls the fields out of a dictionary row in record order
+_bmf_values = itemgetter(*BMF_FIELD_NAMES)
+
+# These fields have only a handful of distinct values across an entire
+# region, so we intern them to let every row share the same few strings
+# instead of holding its own copies.
+_INTERNED_FIELD_NAMES: List[str] = [
+    "STATE",
+    "SUBSECTION",
+    "AFFILIATION",
+    "CLASSIFICATION",
+    "DEDUCTIBILITY",
+    "FOUNDATION",
+    "ORGANIZATION",
+    "STATUS",
+    "ASSET_CD",
+    "INCOME_CD",
+    "FILING_REQ_CD",
+    "PF_FILING_REQ_CD",
+    "ACCT_PD",
+    "NTEE_CD",
+]
+
+
+def _read_columns(index_file: TextIO) -> Optional[List[List[str]]]:
+    """
+    Read the index with `read_csv_columns`, interning the columns listed
+    in `_INTERNED_FIELD_NAMES`.
+    """
+    columns = read_csv_columns(index_file, BMF_FIELD_NAMES)
+    if columns is not None:
+        for name in _INTERNED_FIELD_NAMES:
+            column = columns[BMF_FIELD_NAMES.index(name)]
+            column[:] = map(intern, column)
+    return columns
+
+
 BMFRegion = NewType("BMFRegion", str)
 
 BMFRecordDict = NewType("BMFRecordDict", Dict[str, str])
@@ -71,23 +124,46 @@ class BMFRecord(NamedTuple):
     """
 
     @staticmethod
-    def from_csv(index_file: TextIO,) -> Iterable[BMFRecord]:
-        records: List[BMFRecord] = []
-        for row in csv.DictReader(index_file):
-            record = BMFRecord.from_dict(row)
-            records.append(record)
-        return records
+    def from_csv(index_file: TextIO,) -> Iterator[BMFRecord]:
+        make = BMFRecord._make
+
+        columns = _read_columns(index_file)
+        if columns is not None:
+            for values in zip(*columns):
+                yield make(values)
+            return
+
+        reader = csv.reader(index_file)
+        header = next(reader, None)
+        if header is None:
+            return
+
+        # Work out where each field lives once so that each row can be
+        # turned into a record with a single C-level lookup.
+        try:
+            pick = itemgetter(*[header.index(name) for name in BMF_FIELD_NAMES])
+        except ValueError as e:
+            _logger.error(f"malformed index header - '{e}' - '{header}'")
+            raise
+
+        interned = [header.index(name) for name in _INTERNED_FIELD_NAMES]
+
+        for row in reader:
+            try:
+                for i in interned:
+                    row[i] = intern(row[i])
+                yield make(pick(row))
+            except IndexError:
+                _logger.error(f"malformed index row - '{row}'")
+                raise
 
     @staticmethod
     def from_dict(d: Dict[str, str],) -> BMFRecord:
-        params: Dict[str, str] = {}
         try:
-            for name in BMF_FIELD_NAMES:
-                params[name.lower()] = d[name]
+            return BMFRecord._make(_bmf_values(d))
         except KeyError as e:
             _logger.error(f"malformed index row - '{e}' - '{d}'")
             raise
-        return BMFRecord(**params)
 
     def __repr__(self):
         return self.__str__()
@@ -98,8 +174,13 @@ class BMFRecord(NamedTuple):
     def to_dict(self) -> Dict[str, Any]:
         """
         Support for JSON serialization.
+
+        >>> with open("fixtures/bmf_index.csv") as index_file:
+        ...     record = next(BMFRecord.from_csv(index_file))
+        >>> record.to_dict()["ein"]
+        '010571299'
         """
-        return dict(self.__dict__)
+        return dict(zip(self._fields, self))
 
     ein: str
     name: str
@@ -131,19 +212,137 @@ class BMFRecord(NamedTuple):
     sort_name: str
 
 
-BMFIndex = Dict[EIN, BMFRecord]
+class BMFIndex:
+    """
+    A BMF index that maps EINs to records. The data are stored by column
+    rather than as one record per row, which takes far less memory for
+    large regions and allows a filter to scan only the columns it needs.
+    Records are rebuilt on demand when looked up by EIN.
 
-_bmf_indices: Dict[BMFRegion, BMFIndex] = {}
+    >>> index = BMFIndex()
+    >>> with open("fixtures/bmf_index.csv") as index_file:
+    ...     for record in BMFRecord.from_csv(index_file):
+    ...         index.add(record)
+    >>> len(index)
+    2
+    >>> index[EIN("010571299")].name
+    'HILLSIDE CHURCH'
+    >>> index.column("city")
+    ['WHITEFISH', 'ROUNDUP']
+    >>> list(index.select([1]))
+    ['010613656']
+    """
+
+    __slots__ = ("_columns", "_rows")
+
+    _columns: Tuple[List[str], ...]
+
+    _rows: Dict[EIN, int]
+
+    @staticmethod
+    def from_csv(index_file: TextIO,) -> BMFIndex:
+        """
+        Build an index from a CSV file. When pyarrow is installed the
+        file is parsed straight into columns, otherwise it is read
+        record by record using `BMFRecord.from_csv`.
+        """
+        index = BMFIndex()
+
+        columns = _read_columns(index_file)
+        if columns is None:
+            for record in BMFRecord.from_csv(index_file):
+                index.add(record)
+            return index
+
+        eins = columns[BMFRecord._fields.index("ein")]
+        rows = {EIN(ein): row for row, ein in enumerate(eins)}
+        if len(rows) == len(eins):
+            index._columns = tuple(columns)
+            index._rows = rows
+            return index
+
+        # Duplicate EINs, later rows replace earlier ones
+        for values in zip(*columns):
+            index.add(BMFRecord._make(values))
+        return index
+
+    def __init__(self) -> None:
+        self._columns = tuple([] for _ in BMFRecord._fields)
+        self._rows = {}
+
+    def __contains__(self, ein: object) -> bool:
+        return ein in self._rows
+
+    def __getitem__(self, ein: EIN) -> BMFRecord:
+        row = self._rows[ein]
+        return BMFRecord._make([column[row] for column in self._columns])
+
+    def __iter__(self) -> Iterator[EIN]:
+        return iter(self._rows)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(self, record: BMFRecord) -> None:
+        """
+        Add a record to the index, replacing any existing record
+        with the same EIN.
+        """
+        ein = EIN(record.ein)
+        row = self._rows.get(ein, None)
+        if row is None:
+            self._rows[ein] = len(self._columns[0])
+            for column, value in zip(self._columns, record):
+                column.append(value)
+        else:
+            for column, value in zip(self._columns, record):
+                column[row] = value
+
+    def column(self, name: str) -> List[str]:
+        """
+        The values of the named field (lower case, as on `BMFRecord`)
+        in row order. Row numbers can be passed to `select`.
+        """
+        return self._columns[BMFRecord._fields.index(name)]
+
+    def select(self, rows: Iterable[int]) -> BMFIndex:
+        """
+        Create a new index that contains only the given rows.
+        """
+        index = BMFIndex()
+        ein_column = self._columns[BMFRecord._fields.index("ein")]
+        for row in rows:
+            index._rows[EIN(ein_column[row])] = len(index._columns[0])
+            for source, column in zip(self._columns, index._columns):
+                column.append(source[row])
+        return index
+
+
+BMF_INDEX_CACHE_SIZE = 16
+"""
+The maximum number of BMF indices kept in memory at once. When more
+are requested, the least recently used index is dropped.
+"""
+
+# Like the annual indices, BMF indices don't change at runtime, so we
+# keep the most recently used ones around for reuse.
+# Indices may be loaded from several threads at once, hence the lock.
+_bmf_indices_lock = Lock()
+_bmf_indices: OrderedDict[BMFRegion, BMFIndex] = OrderedDict()
 
 
 def get_bmf_index(region: BMFRegion, downloader: Downloader) -> BMFIndex:
-    if region in _bmf_indices:
-        return _bmf_indices[region]
+    with _bmf_indices_lock:
+        if region in _bmf_indices:
+            _bmf_indices.move_to_end(region)
+            return _bmf_indices[region]
+
+    with downloader.fetch(str(region)) as index_file:
+        index = BMFIndex.from_csv(index_file)
 
-    index: BMFIndex = {}
-    _bmf_indices[region] = index
+    with _bmf_indices_lock:
+        _bmf_indices[region] = index
+        while len(_bmf_indices) > BMF_INDEX_CACHE_SIZE:
+            _bmf_indices.popitem(last=False)
 
-    index_file = downloader.fetch(str(region))
-    for record in BMFRecord.from_csv(index_file):
-        index[EIN(record.ein)] = record
     return index
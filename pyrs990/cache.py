@@ -1,12 +1,36 @@
+import mmap
 import os
+from io import StringIO
 from logging import getLogger
-from typing import Container, Dict, Optional
+from tempfile import mkstemp
+from threading import Lock
+from typing import Container, Dict, Iterator, List, Optional, Set, TextIO, Tuple
+from zlib import crc32
 
 from .constants import DEFAULT_CACHE_PATH
 
 _logger = getLogger(__name__)
 
 
+class CacheWriter:
+    """
+    Adds a document to a cache a piece at a time, for documents that
+    arrive in pieces, like downloads. The document only becomes visible
+    in the cache once `commit` is called. A writer that won't be
+    committed, because the document was never completed, should be
+    discarded instead.
+    """
+
+    def write(self, content: str) -> None:
+        raise NotImplementedError()
+
+    def commit(self) -> None:
+        raise NotImplementedError()
+
+    def discard(self) -> None:
+        raise NotImplementedError()
+
+
 class Cache(Container):
     """
     A generic, abstract, cache to allow fast lookups for XML filings or
@@ -22,6 +46,26 @@ class Cache(Container):
         """
         raise NotImplementedError()
 
+    def open(self, cache_key: str) -> Optional[TextIO]:
+        """
+        Open a cached document for reading, or return `None` if it isn't
+        cached. The caller is responsible for closing the file. The
+        default implementation wraps the result of `get`, caches that can
+        do better should override it.
+        """
+        content = self.get(cache_key)
+        if content is None:
+            return None
+        return StringIO(content)
+
+    def open_writer(self, cache_key: str) -> CacheWriter:
+        """
+        Start caching a document that will be provided in pieces. The
+        default implementation collects the pieces in memory and then
+        calls `put`, caches that can do better should override it.
+        """
+        return _BufferedCacheWriter(self, cache_key)
+
     def put(self, cache_key: str, content: str) -> str:
         """
         Cache a document.
@@ -29,9 +73,47 @@ class Cache(Container):
         raise NotImplementedError()
 
 
+class _BufferedCacheWriter(CacheWriter):
+    """
+    A writer for any cache, it holds on to the pieces and puts the whole
+    document once it is committed.
+
+    >>> c = MemoryCache()
+    >>> w = c.open_writer("foo")
+    >>> w.write("b")
+    >>> w.write("ar")
+    >>> c.get("foo")
+    >>> w.commit()
+    >>> c.get("foo")
+    'bar'
+    """
+
+    _cache: Cache
+
+    _cache_key: str
+
+    _pieces: List[str]
+
+    def __init__(self, cache: Cache, cache_key: str):
+        self._cache = cache
+        self._cache_key = cache_key
+        self._pieces = []
+
+    def write(self, content: str) -> None:
+        self._pieces.append(content)
+
+    def commit(self) -> None:
+        self._cache.put(self._cache_key, "".join(self._pieces))
+        self._pieces = []
+
+    def discard(self) -> None:
+        self._pieces = []
+
+
 class MemoryCache(Cache):
     """
-    A naive, in-memory cache that does no eviction or invalidation.
+    A naive, in-memory cache that does no eviction or invalidation. It is
+    safe to share between threads.
 
     >>> c = MemoryCache()
     >>> c.get("foo")
@@ -43,14 +125,19 @@ class MemoryCache(Cache):
 
     _dict: Dict[str, str]
 
+    _lock: Lock
+
     def __contains__(self, __x: object) -> bool:
-        return __x in self._dict
+        with self._lock:
+            return __x in self._dict
 
     def __init__(self):
         self._dict = {}
+        self._lock = Lock()
 
     def get(self, cache_key: str) -> Optional[str]:
-        content = self._dict.get(cache_key, None)
+        with self._lock:
+            content = self._dict.get(cache_key, None)
         if content is None:
             _logger.debug(f"cache miss fetching cache key '{cache_key}'")
         _logger.debug(f"cache hit fetching cache key '{cache_key}'")
@@ -58,14 +145,50 @@ class MemoryCache(Cache):
 
     def put(self, cache_key: str, content: str) -> str:
         _logger.debug(f"caching cache key '{cache_key}'")
-        self._dict[cache_key] = content
+        with self._lock:
+            self._dict[cache_key] = content
         return content
 
 
+_SHARD_DEPTH = 2
+"""
+The number of directory levels documents are spread across below the
+cache directory, each level named by the next two hex digits of a
+checksum of the key. Two levels give 65,536 directories, which keeps
+each one small even for several years' worth of filings.
+"""
+
+
+def _shard_dirs(cache_key: str) -> Tuple[str, ...]:
+    """
+    The directories, from the top down, that hold the given key.
+
+    >>> _shard_dirs("201843199349300409")
+    ('6f', '07')
+    """
+    digest = f"{crc32(cache_key.encode('utf-8')):08x}"
+    return tuple(digest[2 * i : 2 * i + 2] for i in range(_SHARD_DEPTH))
+
+
+def _scan_files(path: str) -> Iterator[os.DirEntry]:
+    """
+    List the files in a directory, if it exists, but not in any of the
+    directories below it.
+    """
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    yield entry
+    except FileNotFoundError:
+        return
+
+
 class DirectoryCache(Cache):
     """
     A simple on-disk cache that saves documents to the given
-    directory.
+    directory. Documents are spread across nested shard directories so
+    that no single directory grows too large.
 
     TODO: Opened files need to be closed
     TODO: OMG so much edge case and error checking, seriously
@@ -75,18 +198,30 @@ class DirectoryCache(Cache):
     >>> d = tf.mkdtemp()
     >>> c = DirectoryCache(".xml", d)
     >>> c.get("foo")
+    >>> "foo" in c
+    False
     >>> c.put("foo", "bar")
     'bar'
-    >>> p.exists(f"{d}/foo.xml")
+    >>> p.exists(p.join(d, *_shard_dirs("foo"), "foo.xml"))
+    True
+    >>> "foo" in c
     True
+    >>> c.get("foo")
+    'bar'
+    >>> DirectoryCache(".xml", d).get("foo")
+    'bar'
     """
 
     _extension: str
 
+    _keys: Dict[str, str]
+
     _path: str
 
+    _scanned: Set[str]
+
     def __contains__(self, __x: object) -> bool:
-        pass
+        return isinstance(__x, str) and self._find(__x) is not None
 
     def __init__(self, extension: str, path: str = DEFAULT_CACHE_PATH):
         if extension.startswith("."):
@@ -100,31 +235,164 @@ class DirectoryCache(Cache):
             if not os.path.isdir(DEFAULT_CACHE_PATH):
                 os.mkdir(DEFAULT_CACHE_PATH)
             self._path = DEFAULT_CACHE_PATH
-            return
-
-        if os.path.exists(path):
+        elif os.path.exists(path):
             # Attempt to use the existing directory
             if not os.path.isdir(path):
                 raise ValueError(f"path '{path}' is not a directory")
-
             self._path = path
-            return
+        else:
+            os.mkdir(path)
+            self._path = path
 
-        os.mkdir(path)
-        self._path = path
+        # Each directory is listed once, the first time a key that lives
+        # in it is looked up, so that later lookups don't need to touch
+        # the disk at all unless the document is actually cached, and
+        # opening a cache doesn't mean walking every shard. Documents
+        # cached before sharding was introduced sit in the top directory,
+        # which is listed up front. Documents added to a directory by
+        # someone else after it has been listed won't be seen.
+        self._keys = {}
+        self._scanned = set()
+        self._scan(self._path)
+
+    def _find(self, cache_key: str) -> Optional[str]:
+        """
+        The path to the cached document for the given key, if there is
+        one, listing the shard directory it belongs in if that hasn't
+        been done yet.
+        """
+        path = self._keys.get(cache_key, None)
+        if path is None:
+            directory = os.path.dirname(self._shard_path(cache_key))
+            if directory not in self._scanned:
+                self._scan(directory)
+                path = self._keys.get(cache_key, None)
+        return path
+
+    def _scan(self, directory: str) -> None:
+        # Two threads might list the same directory at once, which is
+        # harmless, since they both find the same files.
+        extension_length = len(self._extension)
+        for entry in _scan_files(directory):
+            if entry.name.endswith(self._extension):
+                self._keys.setdefault(
+                    entry.name[:-extension_length], entry.path
+                )
+        self._scanned.add(directory)
+
+    def _shard_path(self, cache_key: str) -> str:
+        file_name = f"{cache_key}{self._extension}"
+        return os.path.join(self._path, *_shard_dirs(cache_key), file_name)
 
     def get(self, cache_key: str) -> Optional[str]:
-        path = os.path.join(self._path, f"{cache_key}{self._extension}")
-        if os.path.exists(path) and os.path.isfile(path):
-            _logger.debug(f"cache hit fetching cache key '{cache_key}'")
-            with open(path) as cache_file:
-                return cache_file.read()
-        _logger.debug(f"cache miss fetching cache key '{cache_key}'")
-        return None
+        path = self._find(cache_key)
+        if path is None:
+            _logger.debug(f"cache miss fetching cache key '{cache_key}'")
+            return None
+
+        _logger.debug(f"cache hit fetching cache key '{cache_key}'")
+        with open(path, "rb") as cache_file:
+            if os.fstat(cache_file.fileno()).st_size == 0:
+                return ""
+            # Decode straight from the mapped pages rather than
+            # reading the file into an intermediate bytes object.
+            with mmap.mmap(
+                cache_file.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                return str(mapped, "utf-8")
+
+    def open(self, cache_key: str) -> Optional[TextIO]:
+        """
+        Open the cached file itself, so that it can be read gradually
+        rather than loaded into memory all at once.
+
+        >>> import tempfile as tf
+        >>> c = DirectoryCache(".xml", tf.mkdtemp())
+        >>> c.open("foo")
+        >>> _ = c.put("foo", "bar")
+        >>> with c.open("foo") as cache_file:
+        ...     cache_file.read()
+        'bar'
+        """
+        path = self._find(cache_key)
+        if path is None:
+            _logger.debug(f"cache miss opening cache key '{cache_key}'")
+            return None
+
+        _logger.debug(f"cache hit opening cache key '{cache_key}'")
+        return open(path, encoding="utf-8", newline="")
+
+    def open_writer(self, cache_key: str) -> CacheWriter:
+        """
+        Write the document straight to disk as it arrives. It is written
+        to a temporary file that is only moved into place once it is
+        complete, so other readers never see a partial document.
+
+        >>> import tempfile as tf
+        >>> c = DirectoryCache(".xml", tf.mkdtemp())
+        >>> w = c.open_writer("foo")
+        >>> w.write("bar")
+        >>> "foo" in c
+        False
+        >>> w.commit()
+        >>> c.get("foo")
+        'bar'
+        """
+        return _FileCacheWriter(self, cache_key)
 
     def put(self, cache_key: str, content: str) -> str:
-        _logger.debug(f"caching cache key '{cache_key}'")
-        path = os.path.join(self._path, f"{cache_key}{self._extension}")
-        with open(path, "w") as cache_file:
-            cache_file.write(content)
+        """
+        Write the document through a temporary file, just like
+        `open_writer`, so that a reader on another thread, or an
+        interrupted write, never leaves a partial document in the cache.
+        """
+        writer = _FileCacheWriter(self, cache_key)
+        try:
+            writer.write(content)
+        except BaseException:
+            writer.discard()
+            raise
+        writer.commit()
         return content
+
+
+class _FileCacheWriter(CacheWriter):
+    _cache: DirectoryCache
+
+    _cache_key: str
+
+    _file: TextIO
+
+    _path: str
+
+    _temp_path: str
+
+    def __init__(self, cache: DirectoryCache, cache_key: str):
+        self._cache = cache
+        self._cache_key = cache_key
+
+        # The temporary file lives next to its final location, so that
+        # it can be renamed into place, but doesn't end with the cache
+        # extension, so it is never mistaken for a cached document.
+        self._path = cache._shard_path(cache_key)
+        directory = os.path.dirname(self._path)
+        os.makedirs(directory, exist_ok=True)
+        fd, self._temp_path = mkstemp(
+            prefix=f"{cache_key}{cache._extension}.",
+            suffix=".tmp",
+            dir=directory,
+        )
+        self._file = open(fd, "w", encoding="utf-8")
+
+    def write(self, content: str) -> None:
+        self._file.write(content)
+
+    def commit(self) -> None:
+        _logger.debug(f"caching cache key '{self._cache_key}'")
+        self._file.close()
+        os.replace(self._temp_path, self._path)
+        self._cache._keys[self._cache_key] = self._path
+
+    def discard(self) -> None:
+        self._file.close()
+        os.remove(self._temp_path)
@@ -21,6 +21,12 @@ CURRENT_VERSION = version
 
 DEFAULT_CACHE_PATH = ".pyrs990-cache"
 
+DEFAULT_CONCURRENCY = 8
+"""
+The number of filings downloaded and parsed at the same time, unless
+told otherwise. Each download gets its own pooled connection.
+"""
+
 IRS_BMF_TEMPLATE = "https://www.irs.gov/pub/irs-soi/eo_{document}.csv"
 """
 A URL template for downloading the Business Master File data from
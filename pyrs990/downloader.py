@@ -1,13 +1,37 @@
+import codecs
 import logging
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from io import StringIO
-from typing import Dict, Iterable, TextIO
+from typing import Deque, Dict, Iterable, Iterator, TextIO, Tuple, cast
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-from .cache import Cache
+from ._streams import TextChunkReader
+from .cache import Cache, CacheWriter
+from .constants import DEFAULT_CONCURRENCY
 
 _logger = logging.getLogger(__name__)
 
+_CHUNK_SIZE = 64 * 1024
+
+_POOL_SIZE = DEFAULT_CONCURRENCY
+
+_TIMEOUT = (3, 30)
+"""
+Seconds to wait for a connection, and then between pieces of a
+response, before giving up on a download rather than hanging forever.
+"""
+
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.2,
+    status_forcelist=[502, 503, 504],
+    raise_on_status=False,
+)
+
 
 class DownloaderException(Exception):
     pass
@@ -19,12 +43,94 @@ class Downloader:
     """
 
     def fetch(self, document: str,) -> TextIO:
+        """
+        Fetch a single document. The result may be streamed from the
+        network as it is read, so it should be read once, from front to
+        back, without seeking.
+        """
         raise NotImplementedError()
 
     def fetch_all(self, documents: Iterable[str],) -> Iterable[TextIO]:
         raise NotImplementedError()
 
 
+class _DownloadBody:
+    """
+    The text of a streamed response, one piece at a time. Each chunk is
+    decoded once, and the same text is handed to the given cache writer
+    as well as the caller. The writer is committed once the last chunk
+    has been read, so a document can be cached without having to wait
+    for it to download before parsing, or holding all of it in memory.
+    If the body is closed before then the writer is discarded. Either
+    way the response is closed along with the body, so its connection
+    goes back to the pool.
+
+    If the body turns out not to be valid in the given encoding, the
+    rest of it is decoded as Latin-1 instead, which is what such
+    documents usually turn out to be, and a warning is logged.
+    """
+
+    _chunks: Iterator[bytes]
+
+    _decoder: codecs.IncrementalDecoder
+
+    _done: bool
+
+    _encoding: str
+
+    _response: requests.Response
+
+    _writer: CacheWriter
+
+    def __init__(
+        self, response: requests.Response, encoding: str, writer: CacheWriter,
+    ):
+        self._chunks = response.iter_content(chunk_size=_CHUNK_SIZE)
+        self._decoder = codecs.getincrementaldecoder(encoding)()
+        self._done = False
+        self._encoding = encoding
+        self._response = response
+        self._writer = writer
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        if self._done:
+            raise StopIteration()
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._done = True
+            text = self._decode(b"", final=True)
+            self._writer.write(text)
+            self._writer.commit()
+            self._response.close()
+            return text
+        text = self._decode(chunk)
+        self._writer.write(text)
+        return text
+
+    def close(self) -> None:
+        if not self._done:
+            self._done = True
+            self._writer.discard()
+        self._response.close()
+
+    def _decode(self, chunk: bytes, final: bool = False) -> str:
+        try:
+            return self._decoder.decode(chunk, final)
+        except UnicodeDecodeError:
+            _logger.warning(
+                f"download is not valid '{self._encoding}', "
+                f"decoding the rest of it as Latin-1"
+            )
+            # The decoder keeps hold of an incomplete character at the
+            # end of the previous chunk, which has to be decoded too.
+            pending, _ = self._decoder.getstate()
+            self._decoder = codecs.getincrementaldecoder("latin-1")()
+            return self._decoder.decode(pending + chunk, final)
+
+
 class FakeDownloader(Downloader):
     """
     A fake for testing pieces of the package that rely on a Downloader
@@ -59,45 +165,109 @@ class HTTPDownloader(Downloader):
     If the download fails for any reason a `DownloaderException` will be
     raised. Its message will include the body of the response.
 
+    Each downloader holds on to a session so that connections to the
+    server are kept alive and reused between documents. Up to `pool_size`
+    connections are kept, so it should be at least the number of threads
+    that share the downloader. Transient server errors are retried a few
+    times before giving up.
+
     TODO: Remove "requests" dependency and just use the std lib
     """
 
     _cache: Cache
 
+    _pool_size: int
+
+    _session: requests.Session
+
     _url_template: str
 
     def __init__(
-        self, url_template: str, cache: Cache,
+        self, url_template: str, cache: Cache, pool_size: int = _POOL_SIZE,
     ):
         self._cache = cache
+        self._pool_size = max(pool_size, 1)
         self._url_template = url_template
 
+        adapter = HTTPAdapter(
+            pool_connections=self._pool_size,
+            pool_maxsize=self._pool_size,
+            max_retries=_RETRY,
+        )
+        self._session = requests.Session()
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
     def fetch(self, document: str,) -> TextIO:
         _logger.info(f"fetching document '{document}'")
-        content = self._cache.get(document)
-        if content is None:
-            url = self._url_template.format(document=document)
-            _logger.info(f"downloading '{url}'")
-            response = requests.get(url)
-            _logger.info(f"download finished '{response.reason}'")
-
-            # Encoding sniffing works way better than just trusting
-            # the Content-Type header
-            response.encoding = response.apparent_encoding
-
-            # We're pretty loose with what we assume to be a successful
-            # download here but that should be fine for now.
-            # TODO: Decide how to handle this exception
-            if response.status_code < 200 or response.status_code > 299:
-                _logger.warning(f"download failed '{response.status_code}'")
+        cached_file = self._cache.open(document)
+        if cached_file is not None:
+            _logger.info("found document in cache")
+            return cached_file
+
+        url = self._url_template.format(document=document)
+        _logger.info(f"downloading '{url}'")
+        response = self._session.get(url, stream=True, timeout=_TIMEOUT)
+        _logger.info(f"download started '{response.reason}'")
+
+        # We're pretty loose with what we assume to be a successful
+        # download here but that should be fine for now.
+        # TODO: Decide how to handle this exception
+        if response.status_code < 200 or response.status_code > 299:
+            _logger.warning(f"download failed '{response.status_code}'")
+            with response:
                 raise DownloaderException(response.text)
 
-            content = self._cache.put(document, response.text)
-        else:
-            _logger.info("found document in cache")
+        # We can't sniff the encoding of a body we haven't received yet,
+        # so only trust the Content-Type header if it actually names a
+        # character set, otherwise assume UTF-8 (which the filings are).
+        # A body that turns out not to be UTF-8 falls back to Latin-1.
+        encoding = "utf-8"
+        if "charset" in response.headers.get("content-type", ""):
+            encoding = response.encoding or encoding
 
-        return StringIO(content)
+        # The body is handed to the caller as it arrives so that parsing
+        # overlaps with the download, and written through to the cache
+        # at the same time. The cached copy becomes available once the
+        # caller has read the whole document.
+        writer = self._cache.open_writer(document)
+        body = _DownloadBody(response, encoding, writer)
+        return cast(TextIO, TextChunkReader(body))
 
     def fetch_all(self, documents: Iterable[str],) -> Iterable[TextIO]:
-        for document in documents:
-            yield self.fetch(document)
+        """
+        Fetch several documents concurrently, yielding them in the order
+        they were given. A few documents are downloaded in full, and
+        cached, ahead of the caller, so the cache must be safe to use
+        from multiple threads (both caches in this package are).
+
+        A document that is requested again while it is still being
+        downloaded shares the download. Later repeats are served from
+        the cache.
+        """
+        with ThreadPoolExecutor(max_workers=self._pool_size) as executor:
+            in_flight: Dict[str, Future[str]] = {}
+            pending: Deque[Tuple[str, Future[str]]] = deque()
+
+            def _next_result() -> TextIO:
+                document, future = pending.popleft()
+                if in_flight.get(document, None) is future:
+                    del in_flight[document]
+                return StringIO(future.result())
+
+            for document in documents:
+                future = in_flight.get(document, None)
+                if future is None:
+                    future = executor.submit(self._fetch_whole, document)
+                    in_flight[document] = future
+                pending.append((document, future))
+                if len(pending) >= self._pool_size:
+                    yield _next_result()
+            while len(pending) > 0:
+                yield _next_result()
+
+    def _fetch_whole(self, document: str,) -> str:
+        # Read the document to the end so that the download actually
+        # happens on the worker thread, rather than as the caller reads.
+        with self.fetch(document) as stream:
+            return stream.read()
@@ -1,16 +1,28 @@
 import sys
+from typing import Optional, Sequence
 
-from . import app
-from ._options import Options, _log_levels, parser
+from ._options import Options, _log_levels, build_parser, handle_version
 
 
-def entry_point():
+def entry_point(argv: Optional[Sequence[str]] = None):
+    """
+    Run the command line tool with the given arguments, or the arguments
+    the process was started with if none are given.
+    """
     import logging
 
+    if argv is None:
+        argv = sys.argv[1:]
+
+    # Answer --version before building the parser or importing the
+    # application since neither is needed to do so.
+    handle_version(argv)
+
     logging.basicConfig()
     logger = logging.getLogger(__package__)
 
-    args = parser.parse_args(sys.argv[1:])
+    parser = build_parser()
+    args = parser.parse_args(argv)
 
     # We do this kinda janky like without the Options instance
     # so that we can log inside the Options factory.
@@ -19,4 +31,6 @@ def entry_point():
 
     options = Options.from_args(args)
 
+    from . import app
+
     app.run(options)
@@ -1,69 +1,118 @@
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass, field, fields
+from dataclasses import dataclass, field, fields
 from logging import getLogger
-from typing import Any, Callable, Dict, Optional
+from operator import attrgetter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Mapping,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+)
 
-from .querier import Querier
+from .querier import (
+    QualifiedPath,
+    Querier,
+    compile_path,
+    qualify_path,
+    stream_texts,
+)
 
 _logger = getLogger(__name__)
 
 
-def float_factory(path: str) -> Dict[str, Callable[[Querier], Optional[float]]]:
+FieldMetadata = Mapping[str, Any]
+
+Combiner = Callable[[Sequence[Optional[str]]], Any]
+
+
+def _field_metadata(paths: Sequence[str], combine: Combiner,) -> FieldMetadata:
     """
-    A helper that returns the correct metadata for a field that receives a
-    float value and requires only a simple XPath query.
+    Build the metadata shared by all field types. The paths are compiled
+    and qualified once, here, and reused for every filing. The `combine`
+    function receives the raw text found at each path, in order, and
+    returns the value of the field.
     """
+    xpaths = tuple(compile_path(path) for path in paths)
 
-    def _get_float(querier: Querier) -> Optional[float]:
-        return querier.find_float(path)
+    def _factory(querier: Querier) -> Any:
+        return combine([querier.find_str(xpath) for xpath in xpaths])
 
-    return {"factory": _get_float}
+    return {
+        "factory": _factory,
+        "xpath": xpaths,
+        "paths": tuple(qualify_path(path) for path in paths),
+        "combine": combine,
+    }
 
 
-def int_factory(path: str) -> Dict[str, Callable[[Querier], Optional[int]]]:
+def _convert_first(convert: Callable[[str], Any]) -> Combiner:
+    def _combine(values: Sequence[Optional[str]]) -> Any:
+        value = values[0]
+        if value is None:
+            return None
+        return convert(value)
+
+    return _combine
+
+
+def float_factory(path: str) -> FieldMetadata:
     """
     A helper that returns the correct metadata for a field that receives a
-    int value and requires only a simple XPath query.
+    float value and requires only a simple XPath query.
     """
+    return _field_metadata((path,), _convert_first(float))
 
-    def _get_int(querier: Querier) -> Optional[int]:
-        return querier.find_int(path)
 
-    return {"factory": _get_int}
+def int_factory(path: str) -> FieldMetadata:
+    """
+    A helper that returns the correct metadata for a field that receives a
+    int value and requires only a simple XPath query.
+    """
+    return _field_metadata((path,), _convert_first(int))
 
 
-def str_factory(path: str) -> Dict[str, Callable[[Querier], Optional[str]]]:
+def str_factory(path: str) -> FieldMetadata:
     """
     A helper that returns the correct metadata for a field that receives a
     str value and requires only a simple XPath query.
     """
+    return _field_metadata((path,), _convert_first(str))
 
-    def _get_str(querier: Querier) -> Optional[str]:
-        return querier.find_str(path)
 
-    return {"factory": _get_str}
-
-
-def two_part_str_factory(
-    path1: str, path2: str, sep="\n"
-) -> Dict[str, Callable[[Querier], Optional[str]]]:
+def two_part_str_factory(path1: str, path2: str, sep="\n") -> FieldMetadata:
     """
     A helper that returns a two-part string field with the parts
     split by the given separator.
     """
 
-    def _factory(querier: Querier) -> Optional[str]:
-        line1 = querier.find_str(path1)
-        line2 = querier.find_str(path2)
-        full: str = sep.join([l for l in [line1, line2] if l is not None])
+    def _combine(values: Sequence[Optional[str]]) -> Optional[str]:
+        full: str = sep.join([l for l in values if l is not None])
         if full == "":
             return None
         return full
 
-    return {"factory": _factory}
+    return _field_metadata((path1, path2), _combine)
 
 
+def _with_slots(cls: type) -> type:
+    """
+    Recreate a dataclass so that its fields are stored in slots rather
+    than an instance dictionary, which is what `dataclass(slots=True)`
+    does on Python 3.10 and later.
+    """
+    namespace = dict(cls.__dict__)
+    namespace["__slots__"] = tuple(f.name for f in fields(cls))
+    namespace.pop("__dict__", None)
+    namespace.pop("__weakref__", None)
+    return type(cls)(cls.__name__, cls.__bases__, namespace)
+
+
+@_with_slots
 @dataclass(init=False)
 class Filing:
     """
@@ -127,12 +176,94 @@ class Filing:
     )
 
     def __init__(self, querier: Querier):
-        for declaredField in fields(self):
-            value = declaredField.metadata["factory"](querier)
-            setattr(self, declaredField.name, value)
+        # Replaced below, once the fields are known, see `_make_init`
+        raise NotImplementedError()
+
+    @staticmethod
+    def from_stream(xml_file: TextIO) -> Filing:
+        """
+        Build a filing in a single streaming pass over the given XML file,
+        which only holds on to part of the tree for large documents and
+        stops parsing once every field has been found, see
+        `stream_texts`. This is what should be used for bulk processing,
+        the `Querier` based constructor is more convenient for exploring
+        a filing.
+
+        >>> with open("fixtures/filing.xml") as xml_file:
+        ...     f = Filing.from_stream(xml_file)
+        >>> f.business_name
+        'VOICE OF SAN DIEGO'
+        >>> f == Filing(Querier.from_path("fixtures/filing.xml"))
+        True
+        """
+        texts = stream_texts(xml_file, FILING_PATHS)
+        filing = Filing.__new__(Filing)
+        for name, metadata in _FIELD_METADATA:
+            values = [texts.get(path) for path in metadata["paths"]]
+            setattr(filing, name, metadata["combine"](values))
+        return filing
 
     def to_json(self) -> Dict[str, Any]:
-        return asdict(self)
+        # The fields are all immutable scalars, so unlike asdict() there
+        # is no need to copy the values.
+        return dict(zip(FILING_FIELD_NAMES, field_values(self)))
+
+
+_FIELD_METADATA: Tuple[Tuple[str, FieldMetadata], ...] = tuple(
+    (f.name, f.metadata) for f in fields(Filing)
+)
+
+
+def _make_init(
+    field_metadata: Sequence[Tuple[str, FieldMetadata]],
+) -> Callable[[Filing, Querier], None]:
+    """
+    Generate an `__init__` for `Filing` that sets each field straight
+    from its factory, one statement per field, the way `dataclass`
+    generates its own, rather than looping over the fields for every
+    filing. The factories are closed over, so looking them up is cheap.
+    """
+    factories = [f"_factory_{i}" for i in range(len(field_metadata))]
+    assignments = "".join(
+        f"        self.{name} = {factory}(querier)\n"
+        for (name, _), factory in zip(field_metadata, factories)
+    )
+    source = (
+        f"def _make({', '.join(factories)}):\n"
+        f"    def __init__(self, querier):\n"
+        f"{assignments}"
+        f"    return __init__\n"
+    )
+    namespace: Dict[str, Any] = {}
+    exec(source, {}, namespace)
+    init: Callable[[Filing, Querier], None] = namespace["_make"](
+        *(metadata["factory"] for _, metadata in field_metadata)
+    )
+    init.__qualname__ = "Filing.__init__"
+    return init
+
+
+setattr(Filing, "__init__", _make_init(_FIELD_METADATA))
+
+FILING_FIELD_NAMES: Tuple[str, ...] = tuple(f.name for f in fields(Filing))
+"""
+The names of the fields available on a `Filing`, in declaration order.
+"""
+
+field_values: Callable[[Filing], Tuple[Any, ...]] = attrgetter(
+    *FILING_FIELD_NAMES
+)
+"""
+Get the values of a filing's fields as a tuple, in the same order as
+`FILING_FIELD_NAMES`.
+"""
+
+FILING_PATHS: Tuple[QualifiedPath, ...] = tuple(
+    path for f in fields(Filing) for path in f.metadata["paths"]
+)
+"""
+Every element path that a `Filing` reads its fields from.
+"""
 
 
 FilingFilter = Callable[[Filing], bool]
@@ -1,8 +1,22 @@
 import re
-from typing import List, Mapping, Pattern
+from operator import attrgetter
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+)
 
-from .filing import Filing, FilingFilter
-from .index import IndexFilter, IndexRecord
+from .annual_record import AnnualIndex, AnnualRecord
+from .bmf_record import BMFIndex, BMFRecord
+from .filing import FILING_FIELD_NAMES, Filing, FilingFilter
+from .index import IndexFilter
+from .types import EIN
 
 
 class FieldNotFound(Exception):
@@ -12,47 +26,181 @@ class FieldNotFound(Exception):
         self.name = name
 
 
-def filter_filings(filters: Mapping[str, str],) -> FilingFilter:
-    patterns: List[Pattern] = []
-    for field_name, filter_text in filters.items():
-        patterns.append(re.compile(filter_text, flags=re.IGNORECASE))
+CompiledFilters = Sequence[Tuple[str, Pattern[str]]]
+"""
+Filters that have already been compiled, as pairs of field name and
+regular expression, in the order they should be applied.
+"""
+
+
+def compile_filters(
+    filters: Mapping[str, str],
+) -> List[Tuple[str, Pattern[str]]]:
+    """
+    Compile a mapping of field names to filter text once, up front, so
+    that the resulting filters can be applied to many records without
+    any further work.
+
+    >>> [(name, p.pattern) for name, p in compile_filters({"zip": "^59"})]
+    [('zip', '^59')]
+    """
+    return [
+        (field_name, re.compile(filter_text, flags=re.IGNORECASE))
+        for field_name, filter_text in filters.items()
+    ]
+
+
+_Check = Tuple[Callable[[Any], Any], Callable[[str], Optional[Any]]]
+
+
+def _matches_all(checks: Sequence[_Check], record: Any) -> bool:
+    for getter, search in checks:
+        value = getter(record)
+        if value is None:
+            return False
+        if search(str(value)) is None:
+            return False
+    return True
+
+
+def filter_filings(filters: CompiledFilters,) -> FilingFilter:
+    """
+    Create a filing filter that passes filings whose fields match all of
+    the given compiled filters. Field names are resolved to getters here,
+    once, so unknown fields are reported before any filing is checked.
+
+    >>> from pyrs990.querier import Querier
+    >>> filing = Filing(Querier.from_path("fixtures/filing.xml"))
+    >>> filter_filings(compile_filters({"us_city_name": "^san"}))(filing)
+    True
+    >>> filter_filings(compile_filters({"us_city_name": "^la"}))(filing)
+    False
+    """
+    checks: List[_Check] = []
+    for field_name, pattern in filters:
+        if field_name not in FILING_FIELD_NAMES:
+            raise FieldNotFound(field_name)
+        checks.append((attrgetter(field_name), pattern.search))
 
     def _filter(filing: Filing) -> bool:
-        passed = True
-        for i, f in enumerate(filters):
-            if not hasattr(filing, f):
-                raise FieldNotFound(f)
-            value = getattr(filing, f)
-            if value is None:
-                return False
-            pattern = patterns[i]
-            match = pattern.search(str(value))
-            if match is None:
-                passed = False
-                break
-        return passed
+        return _matches_all(checks, filing)
 
     return _filter
 
 
-def filter_index_record(filters: Mapping[str, str],) -> IndexFilter:
-    patterns: List[Pattern] = []
-    for field_name, filter_text in filters.items():
-        patterns.append(re.compile(filter_text, flags=re.IGNORECASE))
-
-    def _filter(record: IndexRecord) -> bool:
-        passed = True
-        for i, f in enumerate(filters):
-            if not record.has_field(f):
-                raise FieldNotFound(f)
-            value = record.get_field(f)
-            if value is None:
-                return False
-            pattern = patterns[i]
-            match = pattern.search(str(value))
-            if match is None:
-                passed = False
-                break
-        return passed
+def filter_index_record(filters: CompiledFilters,) -> IndexFilter:
+    """
+    Create an index filter that passes records whose fields match all of
+    the given compiled filters. As with `filter_filings`, field names
+    are resolved once, up front, to getters on whichever record holds
+    the field, annual fields first. The result can be added to an `Index`
+    or passed to `Result.add_index_filter`.
+
+    >>> with open("fixtures/annual_index.csv") as index_file:
+    ...     annual_record = next(AnnualRecord.from_csv(index_file))
+    >>> with open("fixtures/bmf_index.csv") as index_file:
+    ...     bmf_record = next(BMFRecord.from_csv(index_file))
+    >>> passes = filter_index_record(
+    ...     compile_filters({"taxpayer_name": "^LOGOS", "city": "FISH"})
+    ... )
+    >>> passes(annual_record, bmf_record)
+    True
+    >>> passes = filter_index_record(compile_filters({"city": "ROUNDUP"}))
+    >>> passes(annual_record, bmf_record)
+    False
+    """
+    annual_checks: List[_Check] = []
+    bmf_checks: List[_Check] = []
+    for field_name, pattern in filters:
+        if field_name in AnnualRecord._fields:
+            annual_checks.append((attrgetter(field_name), pattern.search))
+        elif field_name in BMFRecord._fields:
+            bmf_checks.append((attrgetter(field_name), pattern.search))
+        else:
+            raise FieldNotFound(field_name)
+
+    def _filter(annual_record: AnnualRecord, bmf_record: BMFRecord) -> bool:
+        return _matches_all(annual_checks, annual_record) and _matches_all(
+            bmf_checks, bmf_record
+        )
 
     return _filter
+
+
+def filter_annual_index(
+    index: AnnualIndex, filters: CompiledFilters,
+) -> AnnualIndex:
+    """
+    Create a new annual index containing only the records that pass all
+    of the given filters. Like `filter_bmf_index`, each filter makes one
+    pass over the survivors of the previous one, so the index that is
+    eventually joined with the BMF data is only as large as it must be.
+
+    >>> from pyrs990.annual_record import AnnualRecord
+    >>> with open("fixtures/annual_index.csv") as index_file:
+    ...     index = {r.ein: r for r in AnnualRecord.from_csv(index_file)}
+    >>> filtered = filter_annual_index(
+    ...     index, compile_filters({"ein": "^133"})
+    ... )
+    >>> list(filtered)
+    ['133085892']
+    """
+    items: Iterable[Tuple[EIN, AnnualRecord]] = index.items()
+    for field_name, pattern in filters:
+        if field_name not in AnnualRecord._fields:
+            raise FieldNotFound(field_name)
+        getter = attrgetter(field_name)
+        search = pattern.search
+        items = [item for item in items if search(getter(item[1])) is not None]
+    return dict(items)
+
+
+def split_bmf_filters(
+    filters: CompiledFilters,
+) -> Tuple[CompiledFilters, CompiledFilters]:
+    """
+    Split index filters into those that only concern BMF fields, which
+    may be applied directly to a BMF index using `filter_bmf_index`,
+    and the rest, which concern annual fields (or fields that don't
+    exist) and may be applied to an annual index using
+    `filter_annual_index`.
+
+    >>> bmf, other = split_bmf_filters(
+    ...     compile_filters({"city": "missoula", "ein": "123"})
+    ... )
+    >>> [name for name, _ in bmf], [name for name, _ in other]
+    (['city'], ['ein'])
+    """
+    bmf_filters: List[Tuple[str, Pattern[str]]] = []
+    other_filters: List[Tuple[str, Pattern[str]]] = []
+    for field_name, pattern in filters:
+        if (
+            field_name in BMFRecord._fields
+            and field_name not in AnnualRecord._fields
+        ):
+            bmf_filters.append((field_name, pattern))
+        else:
+            other_filters.append((field_name, pattern))
+    return bmf_filters, other_filters
+
+
+def filter_bmf_index(index: BMFIndex, filters: CompiledFilters,) -> BMFIndex:
+    """
+    Create a new BMF index containing only the records that pass all of
+    the given filters. Each filter scans only the column it refers to,
+    which is much cheaper than checking every joined index record.
+
+    >>> with open("fixtures/bmf_index.csv") as index_file:
+    ...     index = BMFIndex.from_csv(index_file)
+    >>> filtered = filter_bmf_index(index, compile_filters({"city": "^white"}))
+    >>> list(filtered)
+    ['010571299']
+    """
+    rows: Iterable[int] = range(len(index))
+    for field_name, pattern in filters:
+        if field_name not in BMFRecord._fields:
+            raise FieldNotFound(field_name)
+        column = index.column(field_name)
+        search = pattern.search
+        rows = [row for row in rows if search(column[row]) is not None]
+    return index.select(rows)
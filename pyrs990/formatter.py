@@ -3,6 +3,7 @@ from __future__ import annotations
 import csv
 import json
 import sys
+from operator import attrgetter
 from typing import (
     Any,
     Callable,
@@ -15,7 +16,19 @@ from typing import (
     Type,
 )
 
-from .filing import Filing
+from .filing import FILING_FIELD_NAMES, Filing
+
+_orjson_dumps: Optional[Callable[[Any], bytes]]
+try:
+    from orjson import dumps as _orjson_dumps
+except ImportError:
+    _orjson_dumps = None
+
+_BUFFER_SIZE = 64 * 1024
+"""
+The buffer size used for output files, so that many small writes turn
+into a few large ones.
+"""
 
 _formatters: Dict[str, Callable[[str], Formatter]] = {}
 """
@@ -27,6 +40,27 @@ class FormatterException(Exception):
     pass
 
 
+def dumps(value: Dict[str, Any]) -> str:
+    """
+    Encode a value as compact JSON, with any non-ASCII characters
+    escaped, like the standard library does by default, so the output
+    can be written to a stream in any encoding. If orjson is installed
+    it is used, since it is several times faster than the standard
+    library. It can't escape characters though, so the rare value that
+    has non-ASCII text in it is left to the standard library.
+
+    >>> dumps({"name": "Café", "year": 2004})
+    '{"name":"Caf\\\\u00e9","year":2004}'
+    >>> dumps({"name": "Voice", "year": 2004})
+    '{"name":"Voice","year":2004}'
+    """
+    if _orjson_dumps is not None:
+        encoded = _orjson_dumps(value)
+        if encoded.isascii():
+            return encoded.decode("ascii")
+    return json.dumps(value, separators=(",", ":"))
+
+
 def get_formatter(name: str, destination: str) -> Optional[Formatter]:
     """
     Retrieve the registered formatter with the given name, or return
@@ -135,24 +169,26 @@ class FileFormatter(Formatter):
         elif self._path == ":stderr:":
             self._file = sys.stderr
         else:
-            self._file = open(self._path, "w")
+            self._file = open(self._path, "w", buffering=_BUFFER_SIZE)
 
     def write(self, filing: Filing) -> None:
         if self._file is None:
             raise FormatterException("must call prologue() before write()")
 
         if self._has_written:
-            self._file.write("\n")
+            separator = "\n"
         else:
+            separator = ""
             self._has_written = True
 
         # TODO: Come up with a way to let the user specify which fields to use
-        self._file.write(f"Business Name:          {filing.business_name}\n")
-        self._file.write(f"Formation Year:         {filing.formation_year}\n")
         self._file.write(
+            f"{separator}"
+            f"Business Name:          {filing.business_name}\n"
+            f"Formation Year:         {filing.formation_year}\n"
             f"Principal Officer Name: {filing.principal_officer_name}\n"
+            f"Website Address:        {filing.website_address}\n"
         )
-        self._file.write(f"Website Address:        {filing.website_address}\n")
 
     def epilogue(self) -> None:
         if self._file is None:
@@ -160,6 +196,8 @@ class FileFormatter(Formatter):
 
         if self._path != ":stdout:" and self._path != ":stderr:":
             self._file.close()
+        else:
+            self._file.flush()
 
         self._file = None
 
@@ -171,7 +209,7 @@ class JSONFormatter(Formatter):
 
     >>> f = JSONFormatter(":stdout:")
     >>> f.prologue()
-    {"filings": [
+    {"filings":[
     >>> f.epilogue()
     ]}
 
@@ -195,20 +233,26 @@ class JSONFormatter(Formatter):
         elif self._path == ":stderr:":
             self._file = sys.stderr
         else:
-            self._file = open(self._path, "w")
+            self._file = open(
+                self._path, "w", encoding="utf-8", buffering=_BUFFER_SIZE
+            )
 
-        self._file.write('{"filings": [')
+        self._file.write('{"filings":[')
 
     def write(self, filing: Filing) -> None:
         if self._file is None:
             raise FormatterException("must call prologue() before write()")
 
         if self._has_written:
-            self._file.write(",")
+            separator = ","
         else:
+            separator = ""
             self._has_written = True
 
-        json.dump(filing.to_json(), self._file)
+        # Encoding to a string first lets the encoder run in one go,
+        # json.dump() would make a separate write for every token.
+        content = dumps(filing.to_json())
+        self._file.write(f"{separator}{content}")
 
     def epilogue(self) -> None:
         if self._file is None:
@@ -218,6 +262,8 @@ class JSONFormatter(Formatter):
 
         if self._path != ":stdout:" and self._path != ":stderr:":
             self._file.close()
+        else:
+            self._file.flush()
 
         self._file = None
 
@@ -234,15 +280,28 @@ class CSVWriterProtocol(Protocol):
 @register_formatter("csv")
 class CSVFormatter(Formatter):
     """
-    A Formatter implementation that creates CSV-formatted files.
+    A Formatter implementation that creates CSV-formatted files. There is
+    a header row, followed by one row per filing with every field, in the
+    order the fields are declared on `Filing`.
+
+    >>> from pyrs990.querier import Querier
+    >>> f = CSVFormatter(":stdout:")
+    >>> f.prologue()  # doctest: +ELLIPSIS
+    activity_or_mission_description,business_name,...,website_address
+    >>> f.write(Filing(Querier.from_path("fixtures/filing.xml")))
+    ... # doctest: +ELLIPSIS
+    ON-LINE NEWSPAPER...,VOICE OF SAN DIEGO,2004,...,VOICEOFSANDIEGO.ORG
+    >>> f.epilogue()
     """
 
-    _file: Optional[TextIO] = None
+    _fields = FILING_FIELD_NAMES
 
-    _has_written: bool = False
+    _file: Optional[TextIO] = None
 
     _path: str
 
+    _values = attrgetter(*FILING_FIELD_NAMES)
+
     _writer: Optional[CSVWriterProtocol] = None
 
     def __init__(self, destination: str):
@@ -257,22 +316,18 @@ class CSVFormatter(Formatter):
         elif self._path == ":stderr:":
             self._file = sys.stderr
         else:
-            self._file = open(self._path, "w")
-
-        self._writer = csv.writer(self._file)
+            self._file = open(
+                self._path, "w", newline="", buffering=_BUFFER_SIZE
+            )
 
-        # TODO: Write column headers? How do we choose?
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        self._writer.writerow(self._fields)
 
     def write(self, filing: Filing) -> None:
-        if self._file is None:
+        if self._writer is None:
             return
 
-        if self._has_written:
-            self._file.write(",")
-        else:
-            self._has_written = True
-
-        # TODO: Write data from filing, choosing the same fields as prologue
+        self._writer.writerow(self._values(filing))
 
     def epilogue(self) -> None:
         if self._file is None:
@@ -280,6 +335,8 @@ class CSVFormatter(Formatter):
 
         if self._path not in (":stdout:", ":stderr:"):
             self._file.close()
+        else:
+            self._file.flush()
 
         self._file = None
         self._writer = None
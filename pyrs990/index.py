@@ -1,13 +1,17 @@
 from __future__ import annotations
 
 from logging import getLogger
+from operator import attrgetter
 from typing import (
+    Any,
     Callable,
+    Dict,
     Iterator,
     List,
     NamedTuple,
     Optional,
     Set,
+    Tuple,
     Union,
     cast,
 )
@@ -18,6 +22,16 @@ from .types import EIN
 
 _logger = getLogger(__name__)
 
+_FIELD_DISPATCH: Dict[str, Tuple[int, int]] = {
+    **{name: (1, i) for i, name in enumerate(BMFRecord._fields)},
+    **{name: (0, i) for i, name in enumerate(AnnualRecord._fields)},
+}
+"""
+Maps each index field name to the position of the record that holds it
+within an `IndexRecord`, and the position of the field within that
+record. Annual fields take precedence over BMF fields with the same name.
+"""
+
 
 class IndexRecord(NamedTuple):
     """
@@ -36,25 +50,52 @@ class IndexRecord(NamedTuple):
 
     @staticmethod
     def field_names() -> Set[str]:
-        return set(AnnualRecord._fields + BMFRecord._fields)
+        return set(INDEX_FIELD_NAMES)
+
+    @staticmethod
+    def get_field_getter(name: str) -> Callable[[IndexRecord], Any]:
+        """
+        Return a function that extracts the named field from any index
+        record. Resolving the field once and reusing the getter is much
+        cheaper than calling `get_field` on every record.
+
+        >>> getter = IndexRecord.get_field_getter("ein")
+        >>> getter.__class__.__name__
+        'attrgetter'
+        """
+        if name not in _FIELD_DISPATCH:
+            raise KeyError(f"field '{name}' not found in record")
+        record_index, _ = _FIELD_DISPATCH[name]
+        return attrgetter(f"{IndexRecord._fields[record_index]}.{name}")
 
     def get_field(self, name: str):
-        if hasattr(self.annual_record, name):
-            return getattr(self.annual_record, name)
-        if hasattr(self.bmf_record, name):
-            return getattr(self.bmf_record, name)
-        raise KeyError(f"field '{name}' not found in record")
+        if name not in _FIELD_DISPATCH:
+            raise KeyError(f"field '{name}' not found in record")
+        record_index, field_index = _FIELD_DISPATCH[name]
+        return self[record_index][field_index]
 
     def has_field(self, name: str):
-        return hasattr(self.annual_record, name) or hasattr(
-            self.bmf_record, name
-        )
+        return name in _FIELD_DISPATCH
 
 
-IndexFilter = Callable[[IndexRecord], bool]
+INDEX_FIELD_NAMES: Tuple[str, ...] = AnnualRecord._fields + tuple(
+    name for name in BMFRecord._fields if name not in AnnualRecord._fields
+)
+"""
+The names of the fields available on an `IndexRecord` through
+`IndexRecord.get_field`, annual fields first, without duplicates.
+"""
+
+
+_get_ein = attrgetter("ein")
+
+
+IndexFilter = Callable[[AnnualRecord, BMFRecord], bool]
 """
 A callback that can specify whether a given record should be kept
-as part of the collection of Filings produced by the index.
+as part of the collection of Filings produced by the index. It receives
+the two halves of the joined record, the `IndexRecord` itself is only
+built for records that pass every filter.
 """
 
 
@@ -73,55 +114,92 @@ class Index:
     each index record. The object ID necessary to fetch the document is
     provided on the annual index. Additionally, the object_ids() method may
     be used to access the object IDs directly.
+
+    Each index has its own data and filters.
+
+    >>> first, second = Index(), Index()
+    >>> first.add_filter(lambda annual_record, bmf_record: False)
+    >>> len(first._filters), len(second._filters)
+    (1, 0)
     """
 
-    _annual_indices: List[AnnualIndex] = []
+    __slots__ = (
+        "_annual_indices",
+        "_annual_years",
+        "_bmf_indices",
+        "_bmf_merged",
+        "_bmf_regions",
+        "_filters",
+        "_length",
+    )
 
-    _annual_years: Set[AnnualYear] = set()
+    _annual_indices: List[AnnualIndex]
 
-    _bmf_indices: List[BMFIndex] = []
+    _annual_years: Set[AnnualYear]
 
-    _bmf_regions: Set[BMFRegion] = set()
+    _bmf_indices: List[BMFIndex]
 
-    _filters: Set[IndexFilter] = set()
+    _bmf_merged: Optional[Dict[EIN, BMFIndex]]
 
-    _length: Optional[int] = None
+    _bmf_regions: Set[BMFRegion]
 
-    def __iter__(self) -> Iterator[IndexRecord]:
-        # TODO: Be smarter about which one to iterate first based on filters
-        # TODO: Consider whether re-instantiating all these tuples is too slow
-        for annual_index in self._annual_indices:
-            for bmf_index in self._bmf_indices:
-                for annual_record in annual_index.values():
-                    ein = EIN(annual_record.ein)
-                    if ein not in bmf_index:
-                        _logger.debug(f"EIN not found in BMF index: {ein}")
-                        continue
+    _filters: List[IndexFilter]
 
-                    bmf_record = bmf_index[ein]
+    _length: Optional[int]
 
-                    index_record = IndexRecord(annual_record, bmf_record)
-                    passed = True
-                    for cb in self._filters:
-                        if not cb(index_record):
-                            passed = False
-                            break
+    def __init__(self) -> None:
+        self._annual_indices = []
+        self._annual_years = set()
+        self._bmf_indices = []
+        self._bmf_merged = None
+        self._bmf_regions = set()
+        self._filters = []
+        self._length = None
 
-                    if passed:
-                        yield index_record
+    def __iter__(self) -> Iterator[IndexRecord]:
+        for annual_record, bmf_record in self._joined_records():
+            yield IndexRecord(annual_record, bmf_record)
 
     def __len__(self) -> int:
         if self._length is not None:
             return self._length
 
-        # TODO: This is stupid, don't instantiate the tuples, just count
         length = 0
-        for _ in self:
-            length += 1
+        if len(self._filters) == 0:
+            # Without filters we only need to know whether each annual
+            # record has a BMF counterpart, not what it contains, which
+            # can be counted without running any Python code per record.
+            has_bmf = self._bmf_lookup().__contains__
+            for annual_index in self._annual_indices:
+                eins = map(_get_ein, annual_index.values())
+                length += sum(map(has_bmf, eins))
+        else:
+            for _ in self._joined_records():
+                length += 1
 
         self._length = length
         return self._length
 
+    def _joined_records(self) -> Iterator[Tuple[AnnualRecord, BMFRecord]]:
+        # TODO: Be smarter about which one to iterate first based on filters
+        bmf_lookup = self._bmf_lookup()
+        filters = self._filters
+        for annual_index in self._annual_indices:
+            for annual_record in annual_index.values():
+                ein = EIN(annual_record.ein)
+                bmf_index = bmf_lookup.get(ein, None)
+                if bmf_index is None:
+                    _logger.debug(f"EIN not found in BMF index: {ein}")
+                    continue
+
+                bmf_record = bmf_index[ein]
+
+                for cb in filters:
+                    if not cb(annual_record, bmf_record):
+                        break
+                else:
+                    yield annual_record, bmf_record
+
     def add_annual_index(
         self, year: AnnualYear, annual_index: AnnualIndex
     ) -> None:
@@ -133,13 +211,33 @@ class Index:
     def add_bmf_index(self, region: BMFRegion, bmf_index: BMFIndex) -> None:
         if region not in self._bmf_regions:
             self._length = None
+            self._bmf_merged = None
             self._bmf_indices.append(bmf_index)
             self._bmf_regions.add(region)
 
     def add_filter(self, cb: IndexFilter) -> None:
+        """
+        Add a filter to the index. Filters are applied in the order they
+        were added and each record stops at the first filter it fails, so
+        it pays to add the cheapest and most selective filters first.
+        """
         if cb not in self._filters:
             self._length = None
-            self._filters.add(cb)
+            self._filters.append(cb)
+
+    def _bmf_lookup(self) -> Dict[EIN, BMFIndex]:
+        """
+        Map every EIN in the BMF indices to the index that holds it, so
+        that each annual record is joined with a single lookup, no
+        matter how many regions have been added. If an EIN appears in
+        more than one region, the region added first wins.
+        """
+        if self._bmf_merged is None:
+            merged: Dict[EIN, BMFIndex] = {}
+            for bmf_index in reversed(self._bmf_indices):
+                merged.update(dict.fromkeys(bmf_index, bmf_index))
+            self._bmf_merged = merged
+        return self._bmf_merged
 
     def object_ids(self) -> Iterator[str]:
         """
@@ -160,4 +258,5 @@ class Index:
             self._annual_indices.remove(cast(AnnualIndex, index))
         if index in self._bmf_indices:
             self._length = None
+            self._bmf_merged = None
             self._bmf_indices.remove(cast(BMFIndex, index))
@@ -1,12 +1,236 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from logging import getLogger
-from typing import Dict, Optional, TextIO
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple, Union
 
-from defusedxml import ElementTree
+from lxml import etree
 
 _logger = getLogger(__name__)
 
+NAMESPACES: Dict[str, str] = {
+    "efile": "http://www.irs.gov/efile",
+}
+"""
+The XML namespaces used in filing documents, keyed by the prefixes that
+appear in compiled XPath expressions.
+"""
+
+_PARSER_OPTIONS: Dict[str, bool] = {
+    "resolve_entities": False,
+    "no_network": True,
+    "huge_tree": False,
+}
+"""
+Parser settings that won't expand entities, reach out to the network, or
+accept absurdly deep or large trees, which gives us the same protection
+against hostile documents that defusedxml used to.
+"""
+
+_PARSER = etree.XMLParser(**_PARSER_OPTIONS)
+"""
+A shared parser for whole documents. Incremental parsing keeps state on
+the parser, so it needs a parser of its own each time.
+"""
+
+
+@lru_cache(maxsize=256)
+def compile_path(path: str) -> etree.XPath:
+    """
+    Compile an IRSx-style path into an XPath expression that can be
+    evaluated against the root element of any filing. Compiling is
+    relatively expensive, so this is intended to be done once per path,
+    not once per document. The set of paths in use is small, so recent
+    results are remembered, which keeps string paths passed to the
+    `Querier` methods cheap too.
+
+    Only the first match is ever used, so the expression asks for the
+    first matching child, which lets lxml stop looking among the
+    siblings of a match. The first element found is the same either way.
+
+    >>> querier = Querier.from_path("fixtures/filing.xml")
+    >>> formation_year = compile_path("/IRS990/FormationYr")
+    >>> querier.find_str(formation_year)
+    '2004'
+    """
+    expression = f"{Querier._add_namespace(path)}[1]"
+    return etree.XPath(expression, namespaces=NAMESPACES)
+
+
+QualifiedPath = Tuple[str, ...]
+
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def qualify_path(path: str) -> QualifiedPath:
+    """
+    Convert an IRSx-style path into the fully-qualified tag names of the
+    elements along it, starting below the root element. This is the form
+    that `stream_texts` expects.
+
+    >>> qualify_path("/ReturnHeader/TaxYr")[-1]
+    '{http://www.irs.gov/efile}TaxYr'
+    >>> len(qualify_path("/IRS990/FormationYr"))
+    3
+    """
+    namespace = NAMESPACES["efile"]
+    return tuple(
+        f"{{{namespace}}}{segment[len('efile:'):]}"
+        for segment in Querier._add_namespace(path).split("/")
+    )
+
+
+def _read_from_markup(xml_file: TextIO) -> str:
+    """
+    Read the first chunk of a document that contains any markup, with
+    everything before the first "<" dropped.
+
+    The XML files seem to come back with some kind of unicode identifier
+    sequence at the beginning and Python's XML processing barfs on it. So
+    here we strip it off to make sure that "<" (opening bracket for the
+    doctype) is the first character.
+
+    >>> from io import StringIO
+    >>> _read_from_markup(StringIO("\\ufeff\\ufeff  <?xml"))
+    '<?xml'
+    """
+    chunk = xml_file.read(_STREAM_CHUNK_SIZE)
+    while chunk and chunk.find("<") < 0:
+        chunk = xml_file.read(_STREAM_CHUNK_SIZE)
+    return chunk[chunk.find("<") :]
+
+
+def stream_texts(
+    xml_file: TextIO, paths: Iterable[QualifiedPath],
+) -> Dict[QualifiedPath, Optional[str]]:
+    """
+    Make a single streaming pass over a filing and return the text of the
+    first element found at each of the given paths. Paths that don't
+    appear in the document are left out of the result.
+
+    The tree is pruned as the document is parsed. After each chunk,
+    every element that has been closed is detached, so only the elements
+    that are still open, and whatever was parsed from the last chunk, are
+    held in memory at once. Pulling parse events costs more than just
+    building a tree though, so a document that fits in a single chunk is
+    parsed in one go instead.
+
+    Parsing stops once each path has either been found or can no longer
+    appear, which is when the element that would contain it has been
+    closed. This relies on that element appearing once, which the
+    filing schema guarantees for the paths a `Filing` uses. The file is
+    always read to the end though, so downloaders that cache what they
+    serve still see the whole thing.
+
+    >>> path = qualify_path("/IRS990/FormationYr")
+    >>> with open("fixtures/filing.xml") as xml_file:
+    ...     stream_texts(xml_file, [path])[path]
+    '2004'
+
+    Anything before the first "<" is skipped, like `Querier.from_file`
+    does.
+
+    >>> from io import StringIO
+    >>> with open("fixtures/filing.xml") as xml_file:
+    ...     junk_file = StringIO("\\ufeff \\n" + xml_file.read())
+    >>> stream_texts(junk_file, [path])[path]
+    '2004'
+    """
+    remaining = set(paths)
+    found: Dict[QualifiedPath, Optional[str]] = {}
+
+    # The wanted paths, keyed by the path of the element that contains
+    # them, so they can be given up on once that element is closed.
+    children: Dict[QualifiedPath, List[QualifiedPath]] = {}
+    for path in remaining:
+        children.setdefault(path[:-1], []).append(path)
+    tags = {path[-1] for path in remaining} | {
+        path[-1] for path in children if path
+    }
+
+    parser = etree.XMLPullParser(
+        events=("end",), tag=tags, resolve_entities=False, no_network=True,
+    )
+    root: Optional[etree._Element] = None
+
+    chunk = _read_from_markup(xml_file)
+    next_chunk = xml_file.read(_STREAM_CHUNK_SIZE)
+    if not next_chunk:
+        return _find_texts(chunk, remaining)
+
+    while chunk and remaining:
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            path = _element_path(element)
+            if path in remaining:
+                found[path] = element.text
+                remaining.discard(path)
+            remaining.difference_update(children.get(path, ()))
+            if root is None:
+                root = element.getroottree().getroot()
+        if root is not None:
+            _prune(root)
+        chunk = next_chunk
+        next_chunk = xml_file.read(_STREAM_CHUNK_SIZE) if chunk else ""
+
+    if chunk:
+        # We stopped early, so skip the rest of the document.
+        while chunk:
+            chunk = xml_file.read(_STREAM_CHUNK_SIZE)
+    else:
+        # We parsed the whole document, closing the parser makes sure
+        # that it was well-formed.
+        parser.close()
+
+    return found
+
+
+def _find_texts(
+    document: str, paths: Iterable[QualifiedPath],
+) -> Dict[QualifiedPath, Optional[str]]:
+    parser = etree.XMLParser(**_PARSER_OPTIONS)
+    parser.feed(document)
+    root = parser.close()
+
+    found: Dict[QualifiedPath, Optional[str]] = {}
+    for path in paths:
+        elements: List[etree._Element] = _compile_qualified_path(path)(root)
+        if elements:
+            found[path] = elements[0].text
+    return found
+
+
+@lru_cache(maxsize=256)
+def _compile_qualified_path(path: QualifiedPath) -> etree.ETXPath:
+    """
+    Compile a qualified path into an XPath expression for the first
+    element at that path, like `compile_path` does for IRSx-style paths.
+    """
+    return etree.ETXPath(f"{'/'.join(path)}[1]")
+
+
+def _prune(root: etree._Element) -> None:
+    """
+    Detach every element below the root that has been closed. Only the
+    last child of an element can still be open, so that's the only one
+    kept at each level, on the way down to the element being parsed.
+    """
+    element = root
+    while len(element) > 0:
+        del element[:-1]
+        element = element[-1]
+
+
+def _element_path(element: etree._Element) -> QualifiedPath:
+    tags: List[str] = []
+    parent = element.getparent()
+    while parent is not None:
+        tags.append(element.tag)
+        element = parent
+        parent = element.getparent()
+    tags.reverse()
+    return tuple(tags)
+
 
 class Querier:
     """
@@ -20,9 +244,7 @@ class Querier:
     19
     """
 
-    _namespaces: Dict[str, str]
-
-    _tree: ElementTree
+    _tree: etree._Element
 
     @staticmethod
     def from_path(xml_path: str) -> Querier:
@@ -31,37 +253,37 @@ class Querier:
         Jupyter) use.
         """
         _logger.debug(f"create querier for '{xml_path}'")
-        with open(xml_path) as xml_file:
-            return Querier.from_file(xml_file)
+        # Let lxml read the file itself, it deals with the byte order
+        # mark and the declared encoding on its own.
+        tree = etree.parse(xml_path, _PARSER)
+        return Querier(tree.getroot())
 
     @staticmethod
     def from_file(xml_file: TextIO) -> Querier:
         """
-        The standard factory which accepts a file-like object.
-        """
-        content = xml_file.read()
+        The standard factory which accepts a file-like object. The file is
+        fed to the parser a chunk at a time, so the document is never held
+        in memory as text in addition to the tree built from it.
 
-        # The XML files seem to come back with some kind of unicode identifier
-        # sequence at the beginning and Python's XML processing barfs on it. So
-        # here we strip it off to make sure that "<" (opening bracket for the
-        # doctype) is the first character.
-        while not content.startswith("<"):
-            content = content[1:]
+        >>> with open("fixtures/filing.xml") as xml_file:
+        ...     Querier.from_file(xml_file).find_str("/IRS990/FormationYr")
+        '2004'
+        """
+        parser = etree.XMLParser(**_PARSER_OPTIONS)
 
-        byte_content = content.encode("utf-8")
-        _logger.debug(f"hydrate querier: '{str(byte_content[:40])}'")
+        chunk = _read_from_markup(xml_file)
+        _logger.debug(f"hydrate querier: '{chunk[:40]}'")
 
-        tree = ElementTree.fromstring(byte_content)
+        while chunk:
+            parser.feed(chunk)
+            chunk = xml_file.read(_STREAM_CHUNK_SIZE)
 
-        return Querier(tree)
+        return Querier(parser.close())
 
-    def __init__(self, tree: ElementTree):
-        self._namespaces = {
-            "efile": "http://www.irs.gov/efile",
-        }
+    def __init__(self, tree: etree._Element):
         self._tree = tree
 
-    def find_float(self, path: str) -> Optional[float]:
+    def find_float(self, path: Union[str, etree.XPath]) -> Optional[float]:
         """
         Extract a field from the XML document adn convert
         it to a float before returning it.
@@ -76,7 +298,7 @@ class Querier:
 
         return float(raw_value)
 
-    def find_int(self, path: str) -> Optional[int]:
+    def find_int(self, path: Union[str, etree.XPath]) -> Optional[int]:
         """
         Extract a field from the XML document and
         convert it to an integer before returning it.
@@ -92,29 +314,35 @@ class Querier:
 
         return int(raw_value)
 
-    def find_str(self, path: str) -> Optional[str]:
+    def find_str(self, path: Union[str, etree.XPath]) -> Optional[str]:
         """
         Extract a field from the XML document and return
         it exactly as it was contained in the document.
+
+        The path may be given as a string, which is compiled with
+        `compile_path`, or as an expression already returned by it.
         """
 
         _logger.debug(f"find str at '{path}'")
 
-        full_path = self._add_namespace(path)
-        _logger.debug(f"find str at '{full_path}'")
+        if isinstance(path, str):
+            path = compile_path(path)
 
-        element = self._tree.find(full_path, namespaces=self._namespaces)
+        elements: List[etree._Element] = path(self._tree)
 
-        if element is None:
+        if not elements:
             _logger.debug(f"found str - '{None}'")
             return None
 
+        element = elements[0]
+
         element_content: str = element.text
 
         _logger.debug(f"found str - '{element_content}'")
         return element_content
 
     @staticmethod
+    @lru_cache(maxsize=256)
     def _add_namespace(path: str) -> str:
         """
         Add the default namespace to all path segments
@@ -1,11 +1,93 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, Iterator
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from io import StringIO
+from itertools import islice
+from multiprocessing import get_all_start_methods, get_context
+from multiprocessing.context import BaseContext
+from threading import Lock
+from typing import (
+    Any,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    TextIO,
+    Tuple,
+)
 
+from .constants import DEFAULT_CONCURRENCY
 from .downloader import Downloader
-from .filing import Filing, FilingFilter
-from .index import Index
-from .querier import Querier
+from .filing import FILING_FIELD_NAMES, Filing, FilingFilter, field_values
+from .formatter import dumps
+from .index import Index, IndexFilter, IndexRecord
+
+DEFAULT_PREFETCH = 2
+"""
+The number of filings a `Result` queues up beyond what it is currently
+working on, unless told otherwise.
+"""
+
+_FILING_CACHE_SIZE = 256
+"""
+The number of parsed filings a `Result` holds on to, most recently used
+first, so that iterating it again doesn't parse them again.
+"""
+
+
+def _combine_filters(filters: Sequence[FilingFilter],) -> FilingFilter:
+    """
+    Combine filing filters into a single filter that passes filings that
+    pass all of them, so that checking a filing is one call. The common
+    cases of zero and one filters need no loop at all.
+
+    >>> passes = _combine_filters([lambda f: f > 1, lambda f: f < 3])
+    >>> passes(2), passes(3)
+    (True, False)
+    >>> _combine_filters([])(0)
+    True
+    """
+    if len(filters) == 0:
+        return lambda filing: True
+
+    if len(filters) == 1:
+        return filters[0]
+
+    if len(filters) == 2:
+        first, second = filters
+        return lambda filing: first(filing) and second(filing)
+
+    def _filter(filing: Filing) -> bool:
+        for cb in filters:
+            if not cb(filing):
+                return False
+        return True
+
+    return _filter
+
+
+def _process_context() -> BaseContext:
+    """
+    The multiprocessing context used for parsing processes. Forking a
+    process that is running download threads can copy locks that those
+    threads hold, leaving the child stuck, so workers are started fresh
+    instead, from a fork server where there is one.
+    """
+    if "forkserver" in get_all_start_methods():
+        return get_context("forkserver")
+    return get_context("spawn")
+
+
+def _parse_filing(content: str,) -> Filing:
+    """
+    Parse a whole filing document. This runs in a worker process, so it
+    lives at module level where it can be pickled.
+    """
+    return Filing.from_stream(StringIO(content))
 
 
 class Result:
@@ -15,7 +97,9 @@ class Result:
     The result can be filtered by providing a callback to the `Result.filter`
     method. This will return a new, independent `Result` that will apply all
     filters already applied by the previous `Result`, plus the one that was
-    provided to the method.
+    provided to the method. Filters that only need index data should be
+    added with `Result.add_index_filter` instead, so that filings they
+    reject are never downloaded.
 
     TODO: Enforce immutability assumption
     Right now this type is designed to be immutable so that a given Result
@@ -25,45 +109,193 @@ class Result:
     immutable indices, or copy the data we need from the index when it is
     used to create a Result so that the Result doesn't actually depend on
     the actual Index instance.
+
+    Filings are downloaded and parsed on a pool of `concurrency` threads,
+    running ahead of the caller, but they are always produced in index
+    order. Another `prefetch` filings are queued beyond what the threads
+    can handle at once. As a result, a slow download at the front of
+    the queue doesn't leave the other threads idle, and neither does a
+    slow caller.
+
+    Parsing holds the GIL, so with `processes` above zero it is moved to
+    a pool of that many worker processes instead, while the threads only
+    download. Filters still run here, so they needn't be picklable.
+
+    A result may be narrowed down to a range of its filings with `skip`
+    and `take`. Filings that fall outside of the range aren't downloaded
+    unless they have to be checked against a filter.
+
+    The most recently produced filings are kept, already parsed, and
+    shared with any result derived from this one through a filter.
     """
 
+    _check: FilingFilter
+
+    _concurrency: int
+
     _downloader: Downloader
 
-    _filters: Iterable[FilingFilter]
+    _filing_cache: OrderedDict[str, Filing]
+
+    _filing_cache_lock: Lock
+
+    _filters: Tuple[FilingFilter, ...]
 
     _index: Index
 
+    _index_filters: Tuple[IndexFilter, ...]
+
+    _prefetch: int
+
+    _processes: int
+
+    _start: int
+
+    _stop: Optional[int]
+
     def __init__(
         self,
         downloader: Downloader,
         index: Index,
         filters: Iterable[FilingFilter] = (),
+        concurrency: int = DEFAULT_CONCURRENCY,
+        prefetch: int = DEFAULT_PREFETCH,
+        index_filters: Iterable[IndexFilter] = (),
+        processes: int = 0,
     ):
+        # Take our own copies, so that a generator can't be used up by
+        # the first iteration and a list can't change underneath us.
+        self._filters = tuple(filters)
+        self._index_filters = tuple(index_filters)
+        self._check = _combine_filters(self._filters)
+        self._concurrency = max(concurrency, 1)
         self._downloader = downloader
-        self._filters = filters
+        self._filing_cache = OrderedDict()
+        self._filing_cache_lock = Lock()
         self._index = index
+        self._prefetch = max(prefetch, 0)
+        self._processes = max(processes, 0)
+        self._start = 0
+        self._stop = None
 
     def __iter__(self) -> Iterator[Filing]:
+        if self._start == 0 and self._stop is None:
+            return self._filings(self._records())
+        if not self._filters:
+            # Every downloaded filing is produced, so the range can be
+            # taken from the index records, before anything is fetched.
+            records = islice(self._records(), self._start, self._stop)
+            return self._filings(records)
+        return islice(self._filings(self._records()), self._start, self._stop)
+
+    def _filings(self, records: Iterable[IndexRecord],) -> Iterator[Filing]:
+        executor = ThreadPoolExecutor(max_workers=self._concurrency)
+        parser: Optional[ProcessPoolExecutor] = None
+        if self._processes > 0:
+            parser = ProcessPoolExecutor(
+                max_workers=self._processes, mp_context=_process_context(),
+            )
+        window = self._concurrency + self._prefetch
+        pending: Deque[Tuple[str, Future[Filing]]] = deque()
+        try:
+            for record in records:
+                object_id = record.annual_record.object_id
+                future = self._submit(executor, parser, object_id)
+                pending.append((object_id, future))
+                if len(pending) >= window:
+                    filing = self._remember(*pending.popleft())
+                    if self._check(filing):
+                        yield filing
+            while len(pending) > 0:
+                filing = self._remember(*pending.popleft())
+                if self._check(filing):
+                    yield filing
+        finally:
+            # The caller may stop early, don't leave downloads queued up
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+            if parser is not None:
+                parser.shutdown(wait=True)
+
+    def _derive(
+        self,
+        filters: Iterable[FilingFilter],
+        index_filters: Iterable[IndexFilter],
+    ) -> Result:
+        result = Result(
+            self._downloader,
+            self._index,
+            filters,
+            self._concurrency,
+            self._prefetch,
+            index_filters,
+            self._processes,
+        )
+        # Filters don't change what a filing contains, so the parsed
+        # filings can be shared
+        result._filing_cache = self._filing_cache
+        result._filing_cache_lock = self._filing_cache_lock
+        result._start = self._start
+        result._stop = self._stop
+        return result
+
+    def _fetch_filing(
+        self, parser: Optional[ProcessPoolExecutor], object_id: str,
+    ) -> Filing:
+        with self._downloader.fetch(object_id) as xml_file:
+            if parser is None:
+                return Filing.from_stream(xml_file)
+            content = xml_file.read()
+        return parser.submit(_parse_filing, content).result()
+
+    def _remember(self, object_id: str, future: Future[Filing],) -> Filing:
+        filing = future.result()
+        # Derived results share the cache and may be iterated on other
+        # threads at the same time
+        with self._filing_cache_lock:
+            self._filing_cache[object_id] = filing
+            self._filing_cache.move_to_end(object_id)
+            if len(self._filing_cache) > _FILING_CACHE_SIZE:
+                self._filing_cache.popitem(last=False)
+        return filing
+
+    def _submit(
+        self,
+        executor: ThreadPoolExecutor,
+        parser: Optional[ProcessPoolExecutor],
+        object_id: str,
+    ) -> Future[Filing]:
+        with self._filing_cache_lock:
+            filing = self._filing_cache.get(object_id, None)
+        if filing is None:
+            return executor.submit(self._fetch_filing, parser, object_id)
+        future: Future[Filing] = Future()
+        future.set_result(filing)
+        return future
+
+    def _records(self) -> Iterator[IndexRecord]:
         for record in self._index:
-            xml_file = self._downloader.fetch(record.annual_record.object_id)
-            querier = Querier.from_file(xml_file)
-            filing = Filing(querier)
-            passed = True
-            for cb in self._filters:
-                if not cb(filing):
-                    passed = False
+            for cb in self._index_filters:
+                if not cb(record.annual_record, record.bmf_record):
                     break
-            if passed:
-                yield filing
+            else:
+                yield record
 
     def add_filter(self, cb: FilingFilter,) -> Result:
         """
         Apply a filter to the returned filings. Filings that don't pass the
         given function will not be yielded by the result.
         """
-        return Result(
-            self._downloader, self._index, list(self._filters) + [cb],
-        )
+        return self._derive((*self._filters, cb), self._index_filters)
+
+    def add_index_filter(self, cb: IndexFilter,) -> Result:
+        """
+        Apply a filter to the index records behind the result. Unlike
+        filters added with `add_filter`, these run before anything is
+        downloaded, so rejected filings cost nothing to leave out.
+        """
+        return self._derive(self._filters, (*self._index_filters, cb))
 
     def download_count(self) -> int:
         """
@@ -71,22 +303,62 @@ class Result:
         Result object is iterated. This may be different from the number
         of Filings actually produced upon iteration since some of them
         may be filtered out here (which requires downloading them first).
+        Index filters, on the other hand, are taken into account.
         """
-        return len(self._index)
+        if not self._index_filters:
+            count = len(self._index)
+        else:
+            count = sum(1 for _ in self._records())
+
+        if not self._filters:
+            if self._stop is not None:
+                count = min(count, self._stop)
+            count = max(count - self._start, 0)
+
+        return count
 
     def skip(self, n: int) -> Result:
         """
         Return a result that is identical to this one but doesn't contain the
-        first `n` results.
+        first `n` results. Filters, including any added to the new result,
+        are applied before the results are counted.
         """
-        # TODO: Implement me
+        if n < 0:
+            raise ValueError(f"cannot skip {n} results")
+        result = self._derive(self._filters, self._index_filters)
+        result._start = self._start + n
+        if self._stop is not None:
+            result._start = min(result._start, self._stop)
+        return result
 
     def take(self, n: int) -> Result:
         """
         Return a result that is identical to this one but contains only the
-        first `n` results.
+        first `n` results. Filters, including any added to the new result,
+        are applied before the results are counted.
         """
-        # TODO: Implement me
+        if n < 0:
+            raise ValueError(f"cannot take {n} results")
+        result = self._derive(self._filters, self._index_filters)
+        result._stop = self._start + n
+        if self._stop is not None:
+            result._stop = min(result._stop, self._stop)
+        return result
+
+    def to_columns(self) -> Dict[str, List[Any]]:
+        """
+        Convert the result into columns, one list of values per filing
+        field, in the order the filings are produced. This carries the
+        same data as `to_json` without a dictionary per filing, which
+        is both smaller and what columnar tools like pandas expect.
+        """
+        rows = [field_values(filing) for filing in self]
+        if len(rows) == 0:
+            return {name: [] for name in FILING_FIELD_NAMES}
+        return {
+            name: list(column)
+            for name, column in zip(FILING_FIELD_NAMES, zip(*rows))
+        }
 
     def to_json(self) -> Dict[str, Any]:
         """
@@ -97,3 +369,17 @@ class Result:
         return {
             "filings": [f.to_json() for f in self],
         }
+
+    def write_json(self, out: TextIO,) -> None:
+        """
+        Write the same document `to_json` returns, as compact JSON, to the
+        given file. Each filing is encoded and written as it is produced
+        (with orjson, if it is installed), so the whole result is never
+        held in memory at once.
+        """
+        out.write('{"filings":[')
+        separator = ""
+        for filing in self:
+            out.write(f"{separator}{dumps(filing.to_json())}")
+            separator = ","
+        out.write("]}")
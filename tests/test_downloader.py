@@ -1,3 +1,8 @@
+from io import StringIO
+from threading import Lock
+from time import sleep
+from typing import Dict, Iterator, List, TextIO
+
 import pytest
 
 from pyrs990 import (
@@ -6,6 +11,150 @@ from pyrs990 import (
     HTTPDownloader,
     MemoryCache,
 )
+from pyrs990._arrow import read_csv_columns
+from pyrs990._streams import TextChunkReader
+from pyrs990.downloader import _DownloadBody
+
+
+class FakeResponse:
+    """
+    Stand in for a streamed `requests.Response`, handing out the given
+    chunks and remembering whether it was closed.
+    """
+
+    closed: bool
+
+    headers: Dict[str, str]
+
+    reason: str
+
+    status_code: int
+
+    _chunks: List[bytes]
+
+    def __init__(self, chunks: List[bytes], status_code: int = 200):
+        self.closed = False
+        self.headers = {}
+        self.reason = "fake"
+        self.status_code = status_code
+        self._chunks = chunks
+
+    def __enter__(self) -> "FakeResponse":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def text(self) -> str:
+        return b"".join(self._chunks).decode("utf-8")
+
+    def iter_content(self, chunk_size: int) -> Iterator[bytes]:
+        return iter(self._chunks)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeSession:
+    """
+    Stand in for a `requests.Session` that always gives back the same
+    response.
+    """
+
+    response: FakeResponse
+
+    def __init__(self, response: FakeResponse):
+        self.response = response
+
+    def get(self, url: str, **kwargs) -> FakeResponse:
+        return self.response
+
+
+def fake_downloader(response: FakeResponse) -> HTTPDownloader:
+    downloader = HTTPDownloader("{document}", MemoryCache())
+    downloader._session = FakeSession(response)  # type: ignore
+    return downloader
+
+
+def open_stream(response: FakeResponse, cache: MemoryCache) -> TextChunkReader:
+    writer = cache.open_writer("doc")
+    body = _DownloadBody(response, "utf-8", writer)  # type: ignore
+    return TextChunkReader(body)
+
+
+def test_DownloadBody_streams_and_commits_at_end():
+    # The "é" is split across two chunks
+    response = FakeResponse([b"<a>caf", b"\xc3", b"\xa9</a>", b"", b"!"])
+    cache = MemoryCache()
+    with open_stream(response, cache) as stream:
+        assert stream.read(3) == "<a>"
+        assert cache.get("doc") is None
+        assert not response.closed
+        assert stream.read() == "café</a>!"
+        assert cache.get("doc") == "<a>café</a>!"
+        assert response.closed
+
+
+def test_HTTPDownloader_fetch_streams_through_the_cache():
+    response = FakeResponse([b"<a>", b"b</a>"])
+    downloader = fake_downloader(response)
+    with downloader.fetch("doc") as stream:
+        assert stream.read() == "<a>b</a>"
+    assert response.closed
+    with downloader.fetch("doc") as stream:
+        assert stream.read() == "<a>b</a>"
+
+
+def test_HTTPDownloader_fetch_closes_failed_responses():
+    response = FakeResponse([b"Not Found"], status_code=404)
+    with pytest.raises(DownloaderException, match="Not Found"):
+        fake_downloader(response).fetch("doc")
+    assert response.closed
+
+
+def test_DownloadBody_discards_when_closed_early():
+    response = FakeResponse([b"<a>", b"partial", b"</a>"])
+    cache = MemoryCache()
+    stream = open_stream(response, cache)
+    assert stream.read(3) == "<a>"
+    stream.close()
+    assert response.closed
+    assert cache.get("doc") is None
+    assert "doc" not in cache
+
+
+def test_DownloadBody_falls_back_to_latin_1(caplog):
+    # The "é" at the end of the first chunk is valid UTF-8, cut in half
+    response = FakeResponse([b"caf\xc3", b"\xa9 na\xefve ", b"\xe9"])
+    cache = MemoryCache()
+    with caplog.at_level("WARNING"):
+        with open_stream(response, cache) as stream:
+            assert stream.read() == "cafÃ© naïve é"
+    assert cache.get("doc") == "cafÃ© naïve é"
+    assert len(caplog.records) == 1
+
+
+def test_DownloadBody_decodes_utf_8_once(caplog):
+    response = FakeResponse(["café\n".encode("utf-8"), b"na\xc3", b"\xafve"])
+    cache = MemoryCache()
+    with caplog.at_level("WARNING"):
+        with open_stream(response, cache) as stream:
+            assert list(stream) == ["café\n", "naïve"]
+    assert cache.get("doc") == "café\nnaïve"
+    assert caplog.records == []
+
+
+def test_read_csv_columns_streams_text():
+    pytest.importorskip("pyarrow")
+    rows = "".join(f"{n},naïve {n},x\n" for n in range(20000))
+    index_file = StringIO("ID,NAME,OTHER\n" + rows)
+    columns = read_csv_columns(index_file, ["NAME", "ID"])
+    assert columns is not None
+    names, ids = columns
+    assert len(ids) == 20000
+    assert ids[12345] == "12345"
+    assert names[-1] == "naïve 19999"
 
 
 @pytest.mark.network
@@ -28,3 +177,62 @@ def test_HTTPDownloader_fetch_checks_cache():
     # Give it a cache that is loaded with a bogus object_id
     # It should find the data even though it doesn't exist in AWS
     pass
+
+
+class SlowHTTPDownloader(HTTPDownloader):
+    """
+    Serve each document's name as its content, after a delay, instead of
+    downloading it, and keep track of how many times each was downloaded.
+    Documents are cached like real downloads. Documents named "bad" fail.
+    """
+
+    fetched: Dict[str, int]
+
+    _delays: Dict[str, float]
+
+    _lock: Lock
+
+    def __init__(self, delays: Dict[str, float], pool_size: int = 4):
+        super().__init__("{document}", MemoryCache(), pool_size)
+        self.fetched = {}
+        self._delays = delays
+        self._lock = Lock()
+
+    def fetch(self, document: str,) -> TextIO:
+        cached_file = self._cache.open(document)
+        if cached_file is not None:
+            return cached_file
+        with self._lock:
+            self.fetched[document] = self.fetched.get(document, 0) + 1
+        sleep(self._delays.get(document, 0.0))
+        if document == "bad":
+            raise DownloaderException("bad document")
+        return StringIO(self._cache.put(document, document))
+
+
+def test_HTTPDownloader_fetch_all_keeps_order():
+    # Earlier documents take longest, so they finish last
+    documents = [str(n) for n in range(10)]
+    downloader = SlowHTTPDownloader(
+        {d: 0.01 * (10 - int(d)) for d in documents}
+    )
+    fetched = [f.read() for f in downloader.fetch_all(documents)]
+    assert fetched == documents
+
+
+def test_HTTPDownloader_fetch_all_shares_repeated_downloads():
+    downloader = SlowHTTPDownloader({"a": 0.1})
+    # The last "a" is requested after the first has been produced, so it
+    # comes from the cache instead
+    documents = ["a", "b", "a", "c", "a"]
+    fetched = [f.read() for f in downloader.fetch_all(documents)]
+    assert fetched == documents
+    assert downloader.fetched == {"a": 1, "b": 1, "c": 1}
+
+
+def test_HTTPDownloader_fetch_all_raises_for_failed_document():
+    downloader = SlowHTTPDownloader({}, pool_size=2)
+    results = iter(downloader.fetch_all(["a", "bad", "c"]))
+    assert next(results).read() == "a"
+    with pytest.raises(DownloaderException):
+        next(results)
@@ -0,0 +1,87 @@
+"""
+These tests check that pushing index filters down onto the annual and
+BMF indices, the way the command line tool does, finds the same records
+as filtering the joined `Index`.
+"""
+
+from io import StringIO
+from typing import Dict, List
+
+import pytest
+
+from pyrs990 import AnnualRecord, AnnualYear, BMFIndex, BMFRegion, Index
+from pyrs990.filters import (
+    compile_filters,
+    filter_annual_index,
+    filter_bmf_index,
+    filter_index_record,
+    split_bmf_filters,
+)
+from pyrs990.types import EIN
+
+with open("fixtures/annual_index.csv", encoding="utf-8") as _index_file:
+    ANNUAL_CSV = _index_file.read()
+
+with open("fixtures/bmf_index.csv", encoding="utf-8") as _index_file:
+    # The fixtures don't share any organizations, so give the BMF records
+    # the EINs from the annual index, so that they join
+    BMF_CSV = (
+        _index_file.read()
+        .replace("010571299", "133085892")
+        .replace("010613656", "640411847")
+    )
+
+
+def annual_index() -> Dict[EIN, AnnualRecord]:
+    return {r.ein: r for r in AnnualRecord.from_csv(StringIO(ANNUAL_CSV))}
+
+
+def bmf_index() -> BMFIndex:
+    return BMFIndex.from_csv(StringIO(BMF_CSV))
+
+
+def joined_object_ids(filters: Dict[str, str]) -> List[str]:
+    index = Index()
+    index.add_annual_index(AnnualYear(2018), annual_index())
+    index.add_bmf_index(BMFRegion("mt"), bmf_index())
+    index.add_filter(filter_index_record(compile_filters(filters)))
+    return list(index.object_ids())
+
+
+def pushed_down_object_ids(filters: Dict[str, str]) -> List[str]:
+    bmf_filters, annual_filters = split_bmf_filters(compile_filters(filters))
+    index = Index()
+    index.add_annual_index(
+        AnnualYear(2018), filter_annual_index(annual_index(), annual_filters)
+    )
+    index.add_bmf_index(
+        BMFRegion("mt"), filter_bmf_index(bmf_index(), bmf_filters)
+    )
+    return list(index.object_ids())
+
+
+@pytest.mark.parametrize(
+    "filters, count",
+    [
+        ({}, 2),
+        ({"city": "^white"}, 1),
+        ({"taxpayer_name": "^mississippi"}, 1),
+        ({"taxpayer_name": "^logos", "city": "whitefish"}, 1),
+        ({"taxpayer_name": "^logos", "city": "roundup"}, 0),
+        ({"ein": "^64", "zip": "^59072", "state": "mt"}, 1),
+    ],
+)
+def test_pushed_down_filters_match_joined_index(filters, count):
+    object_ids = joined_object_ids(filters)
+    assert len(object_ids) == count
+    assert pushed_down_object_ids(filters) == object_ids
+
+
+def test_split_bmf_filters_keeps_shared_fields_with_annual():
+    # Fields in both records, like the EIN, are filtered on the annual
+    # index, which is what filter_index_record checks them against too
+    bmf, other = split_bmf_filters(
+        compile_filters({"ein": "1", "name": "a", "taxpayer_name": "b"})
+    )
+    assert [name for name, _ in bmf] == ["name"]
+    assert [name for name, _ in other] == ["ein", "taxpayer_name"]
@@ -1,5 +1,7 @@
 """
-These tests run the command line tool in a subprocess. They are not
+These tests run the command line tool in-process, with its output
+captured, except where the point is to check the installed command
+itself, which requires a subprocess. They are not
 intended to be comprehensive, more of a smoke test to ensure that we
 haven't broken any core functionality or the user interface.
 
@@ -20,12 +22,35 @@ Test cases we want to add:
   - json and csv format
 """
 
+import shutil
 import subprocess as sp
-from typing import NamedTuple
+import sys
+from collections import OrderedDict
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import List, NamedTuple
 
 import pytest
 
+from pyrs990 import annual_record, bmf_record
 from pyrs990.constants import CURRENT_VERSION, PROGRAM_NAME
+from pyrs990.entry_point import entry_point
+
+
+def _python_command() -> List[str]:
+    # Go through poetry where it is installed, so that the tool runs in
+    # the project's environment, otherwise assume we're already in it.
+    if shutil.which("poetry") is not None:
+        return ["poetry", "run", "python"]
+    return [sys.executable]
+
+
+PYTHON_COMMAND = _python_command()
+"""
+The command used to start Python for tests that run the tool in a
+subprocess, chosen once for the whole session.
+"""
 
 
 class Return(NamedTuple):
@@ -37,11 +62,30 @@ class Return(NamedTuple):
 def runit(*args: str) -> Return:
     """
     Run the command line tool with the provided command line arguments.
-    This takes care of running it through poetry so that the tests can
-    focus solely on parameter variations.
+    This calls the entry point directly, rather than starting a new
+    interpreter for every test, so that the tests can focus solely on
+    parameter variations.
+    """
+    stdout = StringIO()
+    stderr = StringIO()
+    status = 0
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            entry_point(list(args))
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 1
+    return Return(
+        stdout=stdout.getvalue(), stderr=stderr.getvalue(), status=status,
+    )
+
+
+def runit_subprocess(*args: str) -> Return:
+    """
+    Like `runit`, but run the command line tool in a subprocess, using
+    `PYTHON_COMMAND`, for tests that need the real command.
     """
     result = sp.run(
-        ["poetry", "run", "python", "-m", PROGRAM_NAME] + list(args),
+        PYTHON_COMMAND + ["-m", PROGRAM_NAME] + list(args),
         capture_output=True,
         encoding="utf-8",
         text=True,
@@ -53,13 +97,18 @@ def runit(*args: str) -> Return:
 
 @pytest.mark.subprocess
 def test_cli_version() -> None:
+    ret = runit_subprocess("--version")
+    assert ret.status == 0
+    assert ret.stdout == f"{CURRENT_VERSION}"
+
+
+def test_version() -> None:
     ret = runit("--version")
     assert ret.status == 0
     assert ret.stdout == f"{CURRENT_VERSION}"
 
 
 @pytest.mark.network
-@pytest.mark.subprocess
 def test_filter_by_taxpayer_name() -> None:
     ret = runit(
         "--taxpayer_name", "TAMARACK GRIEF RESOURCE CENTER", "--use-disk-cache",
@@ -83,3 +132,50 @@ def test_dry_run_with_some_results() -> None:
         == """This would download 60 documents and process 0 total documents
 """
     )
+
+
+@pytest.fixture
+def index_cache(tmp_path: Path, monkeypatch) -> str:
+    """
+    A disk cache holding the fixture indices as the 2018 annual index
+    and the Montana BMF index, so dry runs can be made offline. The BMF
+    records are given EINs from the annual index so that they join.
+    Indices loaded by earlier tests are forgotten, so these are used.
+    """
+    monkeypatch.setattr(annual_record, "_annual_indices", OrderedDict())
+    monkeypatch.setattr(bmf_record, "_bmf_indices", OrderedDict())
+    shutil.copy("fixtures/annual_index.csv", tmp_path / "2018.csv")
+    bmf_csv = Path("fixtures/bmf_index.csv").read_text(encoding="utf-8")
+    bmf_csv = bmf_csv.replace("010571299", "133085892")
+    bmf_csv = bmf_csv.replace("010613656", "640411847")
+    (tmp_path / "mt.csv").write_text(bmf_csv, encoding="utf-8")
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize(
+    "filters, count",
+    [
+        ([], 2),
+        (["--city", "white"], 1),
+        (["--taxpayer_name", "mississippi"], 1),
+        (["--taxpayer_name", "logos", "--city", "white"], 1),
+        (["--taxpayer_name", "logos", "--city", "roundup"], 0),
+    ],
+)
+def test_dry_run_applies_annual_and_bmf_filters(
+    index_cache: str, filters: List[str], count: int
+) -> None:
+    ret = runit(
+        "--years",
+        "2018",
+        "--regions",
+        "mt",
+        "--use-disk-cache",
+        "--cache-path",
+        index_cache,
+        "--dry-run",
+        *filters,
+    )
+    assert ret.status == 0
+    downloads = f"This would download {count} documents"
+    assert ret.stdout == f"{downloads} and process 0 total documents\n"
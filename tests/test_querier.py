@@ -0,0 +1,44 @@
+import re
+from io import StringIO
+
+import pytest
+from lxml import etree
+
+from pyrs990 import Filing
+from pyrs990 import querier as querier_module
+from pyrs990.filing import FILING_PATHS
+from pyrs990.querier import Querier, stream_texts
+
+with open("fixtures/filing.xml", encoding="utf-8") as _filing_file:
+    FILING_XML = _filing_file.read()
+
+
+def padded_filing() -> str:
+    """
+    The fixture filing with plenty of elements we don't care about added
+    both inside the IRS990 element, among the fields we want, and after
+    it, so that it spans many chunks.
+    """
+    padding = "<Padding><Inner>x</Inner></Padding>" * 5000
+    xml = FILING_XML.replace("</IRS990>", f"{padding}</IRS990>", 1)
+    return re.sub("</ReturnData>", f"{padding}</ReturnData>", xml, 1)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000, 64 * 1024])
+def test_stream_texts_matches_querier(monkeypatch, chunk_size):
+    monkeypatch.setattr(querier_module, "_STREAM_CHUNK_SIZE", chunk_size)
+    for xml in [FILING_XML, padded_filing()]:
+        expected = Filing(Querier.from_file(StringIO(xml)))
+        assert Filing.from_stream(StringIO(xml)) == expected
+
+
+def test_stream_texts_reads_to_the_end():
+    xml_file = StringIO(padded_filing())
+    texts = stream_texts(xml_file, FILING_PATHS)
+    assert len(texts) == 11
+    assert xml_file.read() == ""
+
+
+def test_stream_texts_rejects_malformed_documents():
+    with pytest.raises(etree.XMLSyntaxError):
+        stream_texts(StringIO(FILING_XML[:-100]), FILING_PATHS)
@@ -0,0 +1,256 @@
+"""
+These tests run a `Result` against a small, made up index and a fake
+downloader that serves copies of the fixture filing. Each copy has its
+business name replaced with the object ID it was fetched for, so tests
+can tell which filings were produced, and in what order.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from threading import Event, Lock
+from time import sleep
+from typing import Any, Dict, Iterable, List, TextIO
+
+import pytest
+
+import pyrs990.result as result_module
+from pyrs990 import (
+    AnnualRecord,
+    AnnualYear,
+    BMFIndex,
+    BMFRecord,
+    BMFRegion,
+    Downloader,
+    Filing,
+    Index,
+    Result,
+)
+from pyrs990.types import EIN
+
+with open("fixtures/filing.xml", encoding="utf-8") as _filing_file:
+    FILING_XML = _filing_file.read()
+
+BUSINESS_NAME = "VOICE OF SAN DIEGO"
+
+
+class FilingDownloader(Downloader):
+    """
+    Serve a fresh copy of the fixture filing for every object ID and
+    keep track of which ones were fetched.
+    """
+
+    fetched: List[str]
+
+    _lock: Lock
+
+    def __init__(self) -> None:
+        self.fetched = []
+        self._lock = Lock()
+
+    def fetch(self, document: str,) -> TextIO:
+        with self._lock:
+            self.fetched.append(document)
+        return StringIO(FILING_XML.replace(BUSINESS_NAME, document))
+
+    def fetch_all(self, documents: Iterable[str],) -> Iterable[TextIO]:
+        return [self.fetch(d) for d in documents]
+
+
+def object_id(n: int) -> str:
+    return f"20180000000000{n:04d}"
+
+
+def make_index(count: int) -> Index:
+    annual_index: Dict[EIN, AnnualRecord] = {}
+    bmf_index = BMFIndex()
+    for n in range(count):
+        ein = EIN(f"{n:09d}")
+        annual_index[ein] = AnnualRecord._make(
+            [str(n), "EFILE", ein, "201812", "", f"ORG {n}", "990", ""]
+            + [object_id(n)]
+        )
+        bmf_index.add(
+            BMFRecord._make(
+                [ein, f"ORG {n}"] + [""] * (len(BMFRecord._fields) - 2)
+            )
+        )
+    index = Index()
+    index.add_annual_index(AnnualYear(2018), annual_index)
+    index.add_bmf_index(BMFRegion("mt"), bmf_index)
+    return index
+
+
+def names(filings: Iterable[Filing]) -> List[str]:
+    return [filing.business_name for filing in filings]
+
+
+def test_parses_on_processes() -> None:
+    downloader = FilingDownloader()
+    result = Result(downloader, make_index(5), concurrency=2, processes=2)
+    assert names(result) == [object_id(n) for n in range(5)]
+
+
+def is_even(filing: Filing) -> bool:
+    return int(filing.business_name) % 2 == 0
+
+
+def test_take_downloads_only_what_it_produces() -> None:
+    downloader = FilingDownloader()
+    result = Result(downloader, make_index(10)).take(3)
+    assert names(result) == [object_id(n) for n in range(3)]
+    assert sorted(downloader.fetched) == [object_id(n) for n in range(3)]
+
+
+def test_skip_and_take_compose() -> None:
+    result = Result(FilingDownloader(), make_index(10))
+    expected = [object_id(n) for n in range(2, 5)]
+    assert names(result.skip(2).take(3)) == expected
+    assert names(result.take(5).skip(2)) == expected
+    assert names(result.skip(1).skip(1).take(4).take(3)) == expected
+    assert names(result.skip(20)) == []
+    assert names(result.take(0)) == []
+
+
+def test_skip_and_take_reject_negative_counts() -> None:
+    result = Result(FilingDownloader(), make_index(3))
+    with pytest.raises(ValueError):
+        result.skip(-1)
+    with pytest.raises(ValueError):
+        result.take(-1)
+
+
+def test_skip_and_take_count_filtered_filings() -> None:
+    result = Result(FilingDownloader(), make_index(10))
+    filtered = result.add_filter(is_even).skip(1).take(2)
+    assert names(filtered) == [object_id(2), object_id(4)]
+    # Filters added after the range are applied before it, too
+    assert names(result.skip(1).take(2).add_filter(is_even)) == [
+        object_id(2),
+        object_id(4),
+    ]
+
+
+def test_download_count_with_range() -> None:
+    result = Result(FilingDownloader(), make_index(10))
+    assert result.take(3).download_count() == 3
+    assert result.skip(8).download_count() == 2
+    assert result.skip(20).download_count() == 0
+    assert result.skip(2).take(3).download_count() == 3
+    # Which filings pass a filing filter is only known once they have
+    # been downloaded, so every record is counted
+    assert result.add_filter(is_even).take(3).download_count() == 10
+
+
+class SlowDownloader(FilingDownloader):
+    """
+    Take longer to fetch some filings than others, by object ID.
+    """
+
+    _delays: Dict[str, float]
+
+    def __init__(self, delays: Dict[str, float]) -> None:
+        super().__init__()
+        self._delays = delays
+
+    def fetch(self, document: str,) -> TextIO:
+        xml_file = super().fetch(document)
+        sleep(self._delays.get(document, 0.0))
+        return xml_file
+
+
+def test_filings_are_produced_in_index_order() -> None:
+    # Earlier filings take longest, so they finish last
+    delays = {object_id(n): 0.01 * (8 - n) for n in range(8)}
+    result = Result(SlowDownloader(delays), make_index(8), concurrency=4)
+    assert names(result) == [object_id(n) for n in range(8)]
+
+
+class BlockingDownloader(FilingDownloader):
+    """
+    Hold up every filing but the first until `release` is set, and
+    signal when each one is started.
+    """
+
+    release: Event
+
+    started: Dict[str, Event]
+
+    def __init__(self, count: int) -> None:
+        super().__init__()
+        self.release = Event()
+        self.started = {object_id(n): Event() for n in range(count)}
+
+    def fetch(self, document: str,) -> TextIO:
+        self.started[document].set()
+        if document != object_id(0):
+            self.release.wait()
+        return super().fetch(document)
+
+
+def test_stopping_early_cancels_queued_downloads(monkeypatch) -> None:
+    downloader = BlockingDownloader(10)
+
+    class ReleasingExecutor(ThreadPoolExecutor):
+        # By the time the pool is shut down the queued downloads should
+        # have been cancelled, so the held up ones can finish
+        def shutdown(self, *args: Any, **kwargs: Any) -> None:
+            downloader.release.set()
+            super().shutdown(*args, **kwargs)
+
+    monkeypatch.setattr(result_module, "ThreadPoolExecutor", ReleasingExecutor)
+
+    # Four filings are queued before the first is produced
+    result = Result(downloader, make_index(10), concurrency=2, prefetch=2)
+    filings = iter(result)
+    assert next(filings).business_name == object_id(0)
+    # Both threads are held up on the next two, so the fourth is queued
+    assert downloader.started[object_id(1)].wait(5)
+    assert downloader.started[object_id(2)].wait(5)
+    filings.close()
+    started = {d for d, event in downloader.started.items() if event.is_set()}
+    assert started == {object_id(n) for n in range(3)}
+
+
+def test_parsed_filings_are_shared_with_derived_results() -> None:
+    downloader = FilingDownloader()
+    result = Result(downloader, make_index(5))
+    assert len(names(result)) == 5
+    assert names(result.add_filter(is_even)) == [
+        object_id(0),
+        object_id(2),
+        object_id(4),
+    ]
+    assert names(result.add_index_filter(lambda a, b: True)) == names(result)
+    assert len(downloader.fetched) == 5
+
+
+def test_index_filters_skip_downloads() -> None:
+    downloader = FilingDownloader()
+    result = Result(downloader, make_index(6)).add_index_filter(
+        lambda annual_record, bmf_record: annual_record.ein.endswith("1")
+    )
+    assert result.download_count() == 1
+    assert names(result) == [object_id(1)]
+    assert downloader.fetched == [object_id(1)]
+
+
+def test_write_json_matches_to_json() -> None:
+    result = Result(FilingDownloader(), make_index(3))
+    out = StringIO()
+    result.write_json(out)
+    assert json.loads(out.getvalue()) == result.to_json()
+
+    out = StringIO()
+    result.take(0).write_json(out)
+    assert json.loads(out.getvalue()) == {"filings": []}
+
+
+def test_to_columns_matches_to_json() -> None:
+    result = Result(FilingDownloader(), make_index(3))
+    columns = result.to_columns()
+    filings = result.to_json()["filings"]
+    assert list(columns) == list(filings[0])
+    for name, values in columns.items():
+        assert values == [filing[name] for filing in filings]
+    assert result.take(0).to_columns()["business_name"] == []